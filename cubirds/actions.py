@@ -0,0 +1,44 @@
+'''Integer encoding of the moves of a game with n_rows rows.
+
+Lays come first, laying bird b on row r and side s (0 for left, 1 for right)
+being action (b * n_rows + r) * 2 + s. Then come the flocks of each bird, in
+BIRDS order, and passing.
+'''
+import numpy as np
+
+from .catalog import BIRD_INDEX, BIRDS, N_BIRDS
+
+SIDES = ('left', 'right')
+
+
+def n_lay_actions(n_rows):
+    return N_BIRDS * n_rows * 2
+
+def n_actions(n_rows):
+    return n_lay_actions(n_rows) + N_BIRDS + 1
+
+def encode_move(move, phase, n_rows):
+    '''Action of a move in the format of Game.apply, played in phase.'''
+    if phase == 'lay':
+        bird, n_row, side = move
+        return (BIRD_INDEX[bird] * n_rows + n_row) * 2 + SIDES.index(side)
+    return n_lay_actions(n_rows) + (N_BIRDS if move is None else BIRD_INDEX[move])
+
+def decode_action(action, n_rows):
+    '''Move in the format of Game.apply of an action.'''
+    n_lays = n_lay_actions(n_rows)
+    if action < n_lays:
+        bird_row, side = divmod(action, 2)
+        bird, n_row = divmod(bird_row, n_rows)
+        return BIRDS[bird], n_row, SIDES[side]
+    action -= n_lays
+    return None if action == N_BIRDS else BIRDS[action]
+
+def legal_mask(game):
+    '''Boolean array of the legal actions of the current phase of game.'''
+    mask = np.zeros(n_actions(game.n_rows), dtype=bool)
+    if game.current_phase == 'lay':
+        mask[:n_lay_actions(game.n_rows)] = game.legal_lay_mask()
+    else:
+        mask[n_lay_actions(game.n_rows):] = game.legal_flock_mask()
+    return mask
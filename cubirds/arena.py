@@ -0,0 +1,214 @@
+'''Many games played concurrently, with their position evaluations batched.
+
+Every game is driven by a coroutine. Agents are coroutines too: they are
+called with a game and the arena and return the move to play, and await
+Arena.evaluate whenever they need the evaluator's opinion of a position.
+Requests from all the games are gathered until every running game is
+waiting (or max_batch requests are pending), then sent to the evaluator in a
+single call, so that a NumPy or neural network evaluator sees one large
+batch instead of thousands of single positions.
+
+Example:
+    def evaluator(observations):
+        # One value per row of a (n, n_bytes) uint8 array.
+        return observations.astype(np.float32) @ weights
+
+    arena = Arena(evaluator)
+    games = [Game(3, verbose=False, rng=seed) for seed in range(1000)]
+    results = arena.play_games(games, [value_agent] * 3)
+    print(arena.summary())
+'''
+import asyncio
+from timeit import default_timer as dt
+import numpy as np
+
+from .ismcts import determinize, legal_moves
+from ..random_moves import random_choice
+
+
+class Arena:
+    '''Plays games concurrently and batches their evaluation requests.
+
+    Attributes:
+        evaluator (callable): Called with a (n, n_bytes) uint8 array of
+            observations (see Game.encode_observation) and returning a
+            sequence of n results, one per observation.
+        max_batch (int): Largest number of observations per evaluator call.
+            The observations of one evaluate_many call are never split, so a
+            larger call is evaluated alone.
+        n_requests (int): Number of observations evaluated so far.
+        n_batches (int): Number of evaluator calls so far.
+        eval_time (float): Seconds spent in the evaluator.
+    '''
+    def __init__(self, evaluator, max_batch=4096):
+        self.evaluator = evaluator
+        self.max_batch = max_batch
+        self.n_requests = 0
+        self.n_batches = 0
+        self.eval_time = 0.
+        self._pending = []
+        self._n_running = 0
+        self._wake = None
+
+    async def evaluate(self, game, player=None):
+        '''Evaluate the position of game as seen by player (defaults to the
+        current player), batched with the requests of the other games.
+        '''
+        return (await self.evaluate_many([game], [player]))[0]
+
+    async def evaluate_many(self, games, players=None):
+        '''Evaluate several positions at once, e.g. the positions after each
+        legal move. Returns the list of their results.
+        '''
+        if players is None:
+            players = [None] * len(games)
+        observations = [game.encode_observation(game.current_player if player is None else player)
+                        for game, player in zip(games, players)]
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((observations, future))
+        self._wake.set()
+        return await future
+
+    def _flush(self):
+        # Whole requests are evaluated, up to max_batch observations (but at
+        # least one request).
+        n_requests = n_observations = 0
+        for observations, _ in self._pending:
+            if n_requests and n_observations + len(observations) > self.max_batch:
+                break
+            n_requests += 1
+            n_observations += len(observations)
+        batch = self._pending[:n_requests]
+        self._pending = self._pending[n_requests:]
+        results = [[None] * len(observations) for observations, _ in batch]
+
+        # Games of different shapes have observations of different sizes.
+        by_size = {}
+        for i, (observations, _) in enumerate(batch):
+            for j, obs in enumerate(observations):
+                by_size.setdefault(len(obs), []).append((i, j, obs))
+        for size, items in by_size.items():
+            array = np.frombuffer(b''.join(obs for _, _, obs in items),
+                                  dtype=np.uint8).reshape(len(items), size)
+            start = dt()
+            try:
+                out = self.evaluator(array)
+            except Exception as exc:
+                # Fail every game of the batch instead of leaving them waiting.
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+            self.eval_time += dt() - start
+            self.n_batches += 1
+            self.n_requests += len(items)
+            for (i, j, _), result in zip(items, out):
+                results[i][j] = result
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    async def _batcher(self):
+        # Runs until cancelled by play_games_async.
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            # Wait until every running game needs an evaluation, unless the
+            # batch is already full.
+            while self._pending and (
+                    len(self._pending) >= self._n_running
+                    or sum(len(observations) for observations, _ in self._pending)
+                    >= self.max_batch):
+                self._flush()
+
+    async def play(self, game, agents):
+        '''Play game to the end.
+
+        Args:
+            game (Game): The game.
+            agents (list): One agent coroutine function per player, called as
+                agent(game, arena) and returning a move for the current phase
+                in the format of Game.apply.
+
+        Returns:
+            (int, int): The winner (None for a draw) and the number of turns
+                played.
+        '''
+        n_moves = 0
+        try:
+            while not game.end:
+                if game.current_phase == 'lay':
+                    n_moves += 1
+                    move = await agents[game.current_player](game, self)
+                    game.lay(*move)
+                else:
+                    game.flock(await agents[game.current_player](game, self))
+        finally:
+            self._n_running -= 1
+            self._wake.set()
+        return game.winner, n_moves
+
+    async def play_games_async(self, games, agents):
+        '''Coroutine version of play_games, to run in an existing event loop.'''
+        self._wake = asyncio.Event()
+        self._n_running = len(games)
+        batcher = asyncio.ensure_future(self._batcher())
+        played = asyncio.gather(*(self.play(game, agents) for game in games))
+        try:
+            await asyncio.wait({played, batcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not played.done():
+                # The batcher failed while games were waiting on it.
+                played.cancel()
+                raise batcher.exception()
+            return played.result()
+        finally:
+            batcher.cancel()
+
+    def play_games(self, games, agents):
+        '''Play all games concurrently to the end, with the same seats for
+        every game.
+
+        Returns:
+            list: (winner, n_moves) for each game.
+        '''
+        return asyncio.run(self.play_games_async(games, agents))
+
+    def summary(self):
+        '''Batching statistics.
+
+        Returns:
+            dict: Number of evaluator calls, observations evaluated, mean batch
+                size and evaluator time in seconds.
+        '''
+        return {
+            'batches': self.n_batches,
+            'requests': self.n_requests,
+            'batch_size': self.n_requests / self.n_batches if self.n_batches else 0.,
+            'eval_time': self.eval_time,
+        }
+
+
+async def random_agent(game, arena):
+    '''Play a uniformly random legal move, without evaluation.'''
+    return random_choice(legal_moves(game), game.rng)
+
+async def value_agent(game, arena):
+    '''Play the move leading to the position with the highest value, the
+    evaluator returning one value per observation.
+
+    The outcome of each move is sampled on a copy of the game where the
+    cards hidden from the player are redealt (see ismcts.determinize), and
+    all the resulting positions are evaluated in one request.
+    '''
+    moves = legal_moves(game)
+    if len(moves) == 1:
+        return moves[0]
+    player = game.current_player
+    states = []
+    for move in moves:
+        state = determinize(game, player)
+        state.verbose = False
+        state.apply(move)
+        states.append(state)
+    values = await arena.evaluate_many(states, [player] * len(states))
+    return moves[int(np.argmax(values))]
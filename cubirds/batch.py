@@ -0,0 +1,336 @@
+import numpy as np
+
+from .catalog import BIG_ARRAY as BIG, N_BIRDS, SMALL_ARRAY as SMALL
+from .deal import deal_batch
+
+# Marks an empty slot in a row.
+EMPTY = -1
+LEFT, RIGHT = 0, 1
+
+
+class BatchGame:
+    '''Many games of Cubirds stored as arrays and played in lockstep.
+
+    The rules are the same as in Game. Each call to lay/flock plays the
+    corresponding phase in every game that has not ended yet; games that have
+    ended are masked out. Birds are represented by their index in BIRDS, sides
+    by LEFT (0) and RIGHT (1).
+
+    Attributes:
+        n_games (int): The number of games in the batch.
+        n_players (int): The number of players in each game.
+        n_rows (int): The number of rows on each board.
+        rng (np.random.Generator): Source of randomness for all games.
+
+        deck (ndarray): (n_games, N_BIRDS) bird counts in the deck.
+        discard (ndarray): (n_games, N_BIRDS) bird counts in the discard pile.
+        hands (ndarray): (n_games, n_players, N_BIRDS) bird counts in hands.
+        collections (ndarray): (n_games, n_players, N_BIRDS) bird counts in
+                               collections.
+        rows (ndarray): (n_games, n_rows, width) birds on the board, from left
+                        to right, padded with EMPTY. The width grows as needed.
+        row_len (ndarray): (n_games, n_rows) number of birds in each row.
+
+        current_turn (ndarray): (n_games,) turn number of each game.
+        current_player (ndarray): (n_games,) player whose turn it is.
+        n_moves (ndarray): (n_games,) number of turns played by random_turn.
+        end (ndarray): (n_games,) whether each game has ended.
+        winner (ndarray): (n_games,) the winner of each game, or -1 if there
+                          is none (yet).
+    '''
+    def __init__(self, n_games, n_players=4, n_rows=4, rng=None, deal=None):
+        '''Initialize n_games games of Cubirds.
+
+        Args:
+            n_games (int): The number of games.
+            n_players (int): The number of players in each game.
+            n_rows (int): The number of rows on each board. Defaults to 4.
+            rng (np.random.Generator): Defaults to a freshly seeded generator.
+            deal (Deal): Opening states of the games, as made by
+                deal.deal_batch. Dealt with rng if None.
+        '''
+        self.n_games = n_games
+        self.n_players = n_players
+        self.n_rows = n_rows
+        self.rng = np.random.default_rng() if rng is None else rng
+
+        deal = deal_batch(n_games, n_players, n_rows, self.rng) if deal is None else deal
+        self.deck = deal.deck.astype(np.int16)
+        self.discard = deal.discard.astype(np.int16)
+        self.hands = deal.hands.astype(np.int16)
+        self.collections = deal.collections.astype(np.int16)
+        self.rows = np.full((n_games, n_rows, 8), EMPTY, dtype=np.int8)
+        self.rows[:, :, :3] = deal.board
+        self.row_len = np.full((n_games, n_rows), 3, dtype=np.int16)
+
+        self.current_turn = np.zeros(n_games, dtype=np.int16)
+        self.current_player = np.zeros(n_games, dtype=np.int16)
+        self.n_moves = np.zeros(n_games, dtype=np.int16)
+        self.end = np.zeros(n_games, dtype=bool)
+        self.winner = np.full(n_games, -1, dtype=np.int16)
+
+    @property
+    def active(self):
+        '''Indices of the games which have not ended.'''
+        return np.flatnonzero(~self.end)
+
+    def _draw_one(self, games):
+        '''Draw one card in each of the given games, which must have at least
+        one card in their deck and discard pile combined. Shuffles the discard
+        pile into the deck of games whose deck is empty.
+
+        Returns:
+            ndarray: The bird drawn in each game.
+        '''
+        deck = self.deck[games]
+        total = deck.sum(1)
+        empty = total == 0
+        if empty.any():
+            reshuffled = games[empty]
+            self.deck[reshuffled] = self.discard[reshuffled]
+            self.discard[reshuffled] = 0
+            deck[empty] = self.deck[reshuffled]
+            total[empty] = deck[empty].sum(1)
+
+        # Pick the r-th card of each deck and find which bird it is.
+        r = (self.rng.random(len(games)) * total).astype(np.int64)
+        birds = (deck.cumsum(1) <= r[:, None]).sum(1)
+        self.deck[games, birds] -= 1
+        return birds
+
+    def draw(self, games, n=1):
+        '''Draw n cards in each of the given games.
+        Games which do not have n cards in their deck and discard pile
+        combined end in a draw, like in Game.draw.
+
+        Returns:
+            ndarray: (len(games), N_BIRDS) counts of the cards drawn in each
+                     game. Games which ended draw nothing.
+        '''
+        out = np.zeros((len(games), N_BIRDS), dtype=np.int16)
+        short = self.deck[games].sum(1) + self.discard[games].sum(1) < n
+        if short.any():
+            self.end[games[short]] = True
+
+        ok = np.flatnonzero(~short)
+        for _ in range(n):
+            out[ok, self._draw_one(games[ok])] += 1
+        return out
+
+    def _init_hands(self, games):
+        for player in range(self.n_players):
+            games = games[~self.end[games]]
+            self.hands[games, player] = self.draw(games, 8)
+
+    def _reserve(self, width):
+        '''Make sure rows can hold at least width birds.'''
+        if width > self.rows.shape[2]:
+            width = max(width, 2 * self.rows.shape[2])
+            rows = np.full((self.n_games, self.n_rows, width), EMPTY, dtype=np.int8)
+            rows[:, :, :self.rows.shape[2]] = self.rows
+            self.rows = rows
+
+    def _complete_row(self, games, n_rows):
+        '''Complete the selected rows by adding cards from the deck until at
+        least two bird types are represented.
+        '''
+        while len(games):
+            row = self.rows[games, n_rows, :self.row_len[games, n_rows].max(initial=0)]
+            uniform = ((row == row[:, :1]) | (row == EMPTY)).all(1)
+            games, n_rows = games[uniform], n_rows[uniform]
+            drawn = self.draw(games, 1)
+            ok = ~self.end[games]
+            games, n_rows, birds = games[ok], n_rows[ok], drawn[ok].argmax(1)
+
+            self._reserve(self.row_len[games, n_rows].max(initial=0) + 1)
+            self.rows[games, n_rows, self.row_len[games, n_rows]] = birds
+            self.row_len[games, n_rows] += 1
+
+    def lay(self, bird, n_row, side, draw=True):
+        '''Lay all of the current player's cards of type bird on a given row
+        and side, in every active game.
+
+        Args:
+            bird, n_row, side (ndarray): (n_games,) arrays giving each game's
+                lay. Values for games which have ended are ignored.
+            draw (bool): Whether to draw two cards from the deck if no cards are
+                         taken by laying the birds.
+        '''
+        games = self.active
+        bird, n_row, side = bird[games], n_row[games], side[games]
+        player = self.current_player[games]
+        n_laid = self.hands[games, player, bird]
+        assert (n_laid > 0).all(), 'You do not have any of these birds to lay!'
+        self.hands[games, player, bird] = 0
+
+        self._reserve(self.row_len[games, n_row].max(initial=0) + n_laid.max(initial=0))
+        right = side == RIGHT
+        capture = np.zeros(len(games), dtype=bool)
+        capture[right] = self._lay_right(games[right], player[right], bird[right],
+                                         n_row[right], n_laid[right])
+        capture[~right] = self._lay_left(games[~right], player[~right], bird[~right],
+                                         n_row[~right], n_laid[~right])
+
+        if draw:
+            drawing = ~capture
+            self.hands[games[drawing], player[drawing]] += self.draw(games[drawing], 2)
+        self._complete_row(games[capture], n_row[capture])
+
+    def _lay_right(self, games, player, bird, n_row, n_laid):
+        '''Lay birds on the right of rows and give captured birds to players.
+
+        Returns:
+            ndarray: Whether each lay captured birds.
+        '''
+        if not len(games):
+            return np.zeros(0, dtype=bool)
+        length = self.row_len[games, n_row]
+        new_len = length + n_laid
+        width = new_len.max(initial=0)
+        row = self.rows[games, n_row, :width]
+        ix = np.arange(width)
+
+        # Birds to the right of the rightmost bird of the same type are
+        # captured. If there are none, the lay draws instead.
+        match = row == bird[:, None]
+        last = np.where(match.any(1), width - 1 - match[:, ::-1].argmax(1), length - 1)
+        keep = last + 1
+        self._capture(games, player, row, (ix >= keep[:, None]) & (ix < length[:, None]))
+
+        new_len = keep + n_laid
+        self.rows[games, n_row, :width] = np.where(
+            ix < keep[:, None], row,
+            np.where(ix < new_len[:, None], bird[:, None], EMPTY))
+        self.row_len[games, n_row] = new_len
+        return keep < length
+
+    def _lay_left(self, games, player, bird, n_row, n_laid):
+        '''Lay birds on the left of rows and give captured birds to players.
+
+        Returns:
+            ndarray: Whether each lay captured birds.
+        '''
+        if not len(games):
+            return np.zeros(0, dtype=bool)
+        length = self.row_len[games, n_row]
+        width = (length + n_laid).max(initial=0)
+        row = self.rows[games, n_row, :width]
+        ix = np.arange(width)
+
+        # Birds to the left of the leftmost bird of the same type are
+        # captured. If there are none, the lay draws instead.
+        match = row == bird[:, None]
+        start = np.where(match.any(1), match.argmax(1), 0)
+        self._capture(games, player, row, ix < start[:, None])
+
+        new_len = n_laid + length - start
+        src = np.clip(start[:, None] + ix - n_laid[:, None], 0, width - 1)
+        kept = np.take_along_axis(row, src, 1)
+        self.rows[games, n_row, :width] = np.where(
+            ix < n_laid[:, None], bird[:, None],
+            np.where(ix < new_len[:, None], kept, EMPTY))
+        self.row_len[games, n_row] = new_len
+        return start > 0
+
+    def _capture(self, games, player, row, captured):
+        '''Move the birds of row where captured is True to players' hands.'''
+        cell_game, cell = np.nonzero(captured)
+        self.hands[games, player] += np.bincount(
+            cell_game * N_BIRDS + row[cell_game, cell],
+            minlength=len(games) * N_BIRDS).reshape(-1, N_BIRDS)
+
+    def flock(self, bird):
+        '''Make a flock of the given bird, or pass if bird is -1, in every
+        active game. Then end the turn.
+
+        Args:
+            bird (ndarray): (n_games,) the bird each game's current player
+                flocks, or -1 to pass. Values for games which have ended are
+                ignored.
+        '''
+        games = self.active
+        bird = bird[games]
+        player = self.current_player[games]
+
+        flocking = bird >= 0
+        f_games, f_player, f_bird = games[flocking], player[flocking], bird[flocking]
+        n_birds = self.hands[f_games, f_player, f_bird]
+        assert (n_birds >= SMALL[f_bird]).all(), 'You need more birds to make a flock.'
+        size = np.where(n_birds >= BIG[f_bird], 2, 1)
+        self.collections[f_games, f_player, f_bird] += size
+        self.discard[f_games, f_bird] += n_birds - size
+        self.hands[f_games, f_player, f_bird] = 0
+
+        win = self._check_win(self.collections[games, player])
+        self.winner[games[win]] = player[win]
+        self.end[games[win]] = True
+
+        games, player = games[~win], player[~win]
+        empty = self.hands[games, player].sum(1) == 0
+        self._next_round(games[empty])
+        self._next_turn(games[~empty])
+
+    def _next_turn(self, games):
+        self.current_player[games] += 1
+        wrap = games[self.current_player[games] >= self.n_players]
+        self.current_player[wrap] = 0
+        self.current_turn[wrap] += 1
+
+    def _next_round(self, games):
+        '''Discard all the cards in players' hands and deal 8 new ones. The
+        current player keeps the turn.
+        '''
+        self.discard[games] += self.hands[games].sum(1)
+        self.hands[games] = 0
+        self._init_hands(games)
+
+    @staticmethod
+    def _check_win(collections):
+        '''Checks which of the given collections are winning ones.
+        There are two win conditions: having seven different species or having
+        at least three of two different species.
+        '''
+        return ((collections > 0).sum(-1) >= 7) | ((collections >= 3).sum(-1) >= 2)
+
+    def random_turn(self):
+        '''Make a random lay and flock (if one is available) action in every
+        active game. Lays are uniform over (bird, row, side) options and
+        flocks uniform over available flocks, like random_moves.random_turn.
+        '''
+        games = self.active
+        self.n_moves[games] += 1
+        player = self.current_player[games]
+
+        bird = np.zeros(self.n_games, dtype=np.int16)
+        bird[games] = _random_choice(self.hands[games, player] > 0, self.rng)
+        n_row = self.rng.integers(0, self.n_rows, self.n_games)
+        side = self.rng.integers(0, 2, self.n_games)
+        self.lay(bird, n_row, side, draw=True)
+
+        games = self.active
+        player = self.current_player[games]
+        bird = np.full(self.n_games, -1, dtype=np.int16)
+        available = self.hands[games, player] >= SMALL
+        can_flock = available.any(1)
+        bird[games[can_flock]] = _random_choice(available[can_flock], self.rng)
+        self.flock(bird)
+
+    def playout(self):
+        '''Play all games with random moves until they end.
+
+        Returns:
+            ndarray: The winner of each game, or -1 for draws.
+            ndarray: The number of turns played in each game.
+        '''
+        while not self.end.all():
+            self.random_turn()
+        return self.winner, self.n_moves
+
+
+def _random_choice(options, rng):
+    '''Pick one True column uniformly at random in each row of a boolean
+    array. Every row must have at least one True value.
+    '''
+    cumulative = options.cumsum(1)
+    r = (rng.random(len(options)) * cumulative[:, -1]).astype(np.int64)
+    return (cumulative <= r[:, None]).sum(1)
@@ -1,15 +1,18 @@
-from random import shuffle
-from multiset import Multiset
+from collections import deque
 import json
 import numpy as np
-from ..utils import card_data
+from .catalog import BIRD_INDEX, BIRDS, COUNT, N_BIRDS
 
 
-class UnorderedCards(Multiset):
+class UnorderedCards:
     '''An unordered stack of cards. Has a dict (multiset) form and a list form.
     Both can be used to update the stack. Supports subscripting to get and set
     card counts, as well as +, - and 'in' operators to combine stacks together.
 
+    The stack is stored as a fixed-length list of counts, one per bird type
+    (in the order of BIRDS), so that all operations are simple loops over
+    eight integers.
+
     Example:
         stack = UnorderedCards(['cube', 'cube'])
         stack['sandwich'] += 1
@@ -19,64 +22,167 @@ class UnorderedCards(Multiset):
         print(stack.l)
         # ['sandwich']
     '''
+    __slots__ = ('_counts',)
+
+    def __init__(self, cards=None):
+        '''Args:
+            cards (None, UnorderedCards, dict or iterable): Initial content of
+                the stack. A dict maps bird names to counts, any other iterable
+                lists bird names.
+        '''
+        if cards is None:
+            self._counts = [0] * N_BIRDS
+        elif isinstance(cards, UnorderedCards):
+            self._counts = cards._counts[:]
+        elif isinstance(cards, dict):
+            counts = [0] * N_BIRDS
+            for bird, count in cards.items():
+                counts[BIRD_INDEX[bird]] = count
+            self._counts = counts
+        else:
+            counts = [0] * N_BIRDS
+            for bird in cards:
+                counts[BIRD_INDEX[bird]] += 1
+            self._counts = counts
+
+    @classmethod
+    def from_counts(cls, counts):
+        '''Build a stack from a sequence of N_BIRDS counts (in BIRDS order).
+        '''
+        stack = cls.__new__(cls)
+        stack._counts = [int(c) for c in counts]
+        return stack
+
+    def get_counts(self):
+        '''Tuple of the count of each bird, in BIRDS order.'''
+        return tuple(self._counts)
+
+    def set_counts(self, counts):
+        self._counts = list(counts)
+
+    counts = property(get_counts, set_counts)
 
     def __str__(self):
-        out = {k: v for k, v in self.items() if v > 0}
-        return json.dumps(out, indent=4, sort_keys=True)
+        return json.dumps(self.to_dict(), indent=4, sort_keys=True)
 
     def __repr__(self):
-        out = {k: v for k, v in self.items() if v > 0}
-        return str(out)
+        return str(self.to_dict())
+
+    def __getitem__(self, bird):
+        return self._counts[BIRD_INDEX[bird]]
+
+    def __setitem__(self, bird, count):
+        self._counts[BIRD_INDEX[bird]] = count
+
+    def __contains__(self, bird):
+        return self._counts[BIRD_INDEX[bird]] > 0
+
+    def __len__(self):
+        return sum(self._counts)
+
+    def __iter__(self):
+        for bird, count in zip(BIRDS, self._counts):
+            for _ in range(count):
+                yield bird
+
+    def __eq__(self, other):
+        if not isinstance(other, UnorderedCards):
+            if not isinstance(other, (dict, list, tuple)):
+                return NotImplemented
+            other = UnorderedCards(other)
+        return self._counts == other._counts
+
+    __hash__ = None
+
+    def copy(self):
+        return _new(self._counts[:])
+
+    def keys(self):
+        return [bird for bird, count in zip(BIRDS, self._counts) if count > 0]
+
+    distinct_elements = keys
+
+    def values(self):
+        return [count for count in self._counts if count > 0]
+
+    def items(self):
+        return [(bird, count) for bird, count in zip(BIRDS, self._counts) if count > 0]
 
     def get_list(self):
         return list(iter(self))
 
     def set_list(self, new_list):
-        self = Multiset(new_list)
+        self._counts = UnorderedCards(new_list)._counts
 
     l = property(get_list, set_list)
 
     @property
     def empty(self):
-        return len(self) == 0
+        return not any(self._counts)
 
     def n_unique(self):
         '''Number of unique card types which appear at least once in the stack.
         '''
-        return len(self.distinct_elements())
+        return N_BIRDS - self._counts.count(0)
 
     def __add__(self, other):
-        if isinstance(other, list):
-            other = Multiset(other)
-        return super(Multiset, self).__add__(other)
+        other = _counts_of(other)
+        return _new([a + b for a, b in zip(self._counts, other)])
 
     def __sub__(self, other):
-        if isinstance(other, list):
-            other = Multiset(other)
-        return super(Multiset, self).__sub__(other)
+        other = _counts_of(other)
+        return _new([a - b if a > b else 0 for a, b in zip(self._counts, other)])
 
-    def draw(self, n=1):
+    def __iadd__(self, other):
+        counts = self._counts
+        for i, count in enumerate(_counts_of(other)):
+            if count:
+                counts[i] += count
+        return self
+
+    def __isub__(self, other):
+        counts = self._counts
+        for i, count in enumerate(_counts_of(other)):
+            if count:
+                counts[i] = counts[i] - count if counts[i] > count else 0
+        return self
+
+    def draw(self, n=1, rng=None):
         '''Draw n random cards from self and return them.
+
+        Args:
+            n (int): The number of cards to draw. Stops early if self runs out.
+            rng (np.random.Generator): Source of randomness. Defaults to
+                NumPy's global random state.
         '''
-        out = []
-        l = len(self)
-        birds = list(self.distinct_elements())
-        for _ in range(n):
-            if l == 0:
-                break
-            selected_bird = np.random.choice(birds, p=[self[k]/l for k in birds])
-            out.append(selected_bird)
-            self[selected_bird] -= 1
+        out = [0] * N_BIRDS
+        counts = self._counts
+        l = sum(counts)
+        n = min(n, l)
+        if n == 0:
+            return _new(out)
+        # One uniform number per card, all sampled in one call.
+        for u in (np.random if rng is None else rng).random(n).tolist():
+            # Pick the r-th card of the stack and find which bird it is.
+            r = int(u * l)
+            i = 0
+            while r >= counts[i]:
+                r -= counts[i]
+                i += 1
+            counts[i] -= 1
+            out[i] += 1
             l -= 1
 
-        return UnorderedCards(out)
+        return _new(out)
 
     def draw_all(self, bird):
         '''Draw all cards of type bird from self and return them.
         '''
-        out = [bird] * self[bird]
-        self[bird] = 0
-        return UnorderedCards(out)
+        i = BIRD_INDEX[bird]
+        out = [0] * N_BIRDS
+        out[i] = self._counts[i]
+        self._counts[i] = 0
+        return _new(out)
 
     def dedupe(self):
         '''Separate the stack into its unique elements and any extra duplicates.
@@ -84,29 +190,183 @@ class UnorderedCards(Multiset):
             UnorderedCards: a stack containing only unique cards.
             UnorderedCards: a stack containing only extra duplicates.
         '''
-        dupes = UnorderedCards()
-        for bird, count in self.items():
+        counts = self._counts
+        dupes = [0] * N_BIRDS
+        for i, count in enumerate(counts):
             if count >= 2:
-                self[bird] = 1
-                dupes[bird] = count - 1
+                counts[i] = 1
+                dupes[i] = count - 1
 
-        return self, dupes
+        return self, _new(dupes)
 
     def to_dict(self):
-        return { k:v for k, v in self.items() }
+        return {bird: count for bird, count in zip(BIRDS, self._counts) if count > 0}
 
-def get_deck():
-    '''Return a UnorderedCards of all 110 cards in the game.
+
+class Row:
+    '''An ordered row of cards on the board, from left to right.
+
+    Besides the cards, the row keeps the positions of each bird type in the
+    row, so that finding what a lay captures is O(1) and capturing k cards is
+    O(k). Rows can be iterated over and compared to lists of bird names.
+
+    Example:
+        row = Row(['cube', 'sparrow', 'duck'])
+        row.n_captured('cube', 'right')
+        # 2
+        row.lay('cube', 2, 'right')
+        # ['sparrow', 'duck']
+        print(list(row))
+        # ['cube', 'cube', 'cube']
+    '''
+    __slots__ = ('_cards', '_left', '_positions')
+
+    def __init__(self, cards=()):
+        # Positions are absolute: the leftmost card is at self._left and
+        # laying on the left decreases it.
+        self._cards = deque()
+        self._left = 0
+        self._positions = [deque() for _ in range(N_BIRDS)]
+        for bird in cards:
+            self.append(bird)
+
+    def __len__(self):
+        return len(self._cards)
+
+    def __iter__(self):
+        return iter(self._cards)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self._cards)[i]
+        return self._cards[i]
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            return self._cards == other._cards
+        if isinstance(other, (list, tuple)):
+            return list(self._cards) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Row({})'.format(list(self._cards))
+
+    def copy(self):
+        row = Row.__new__(Row)
+        row._cards = self._cards.copy()
+        row._left = self._left
+        row._positions = [positions.copy() for positions in self._positions]
+        return row
+
+    @property
+    def counts(self):
+        '''Tuple of the count of each bird in the row, in BIRDS order.'''
+        return tuple(len(positions) for positions in self._positions)
+
+    def n_unique(self):
+        '''Number of unique card types in the row.'''
+        return sum(1 for positions in self._positions if positions)
+
+    def append(self, bird):
+        '''Add a card on the right of the row.'''
+        self._positions[BIRD_INDEX[bird]].append(self._left + len(self._cards))
+        self._cards.append(bird)
+
+    def appendleft(self, bird):
+        '''Add a card on the left of the row.'''
+        self._left -= 1
+        self._positions[BIRD_INDEX[bird]].appendleft(self._left)
+        self._cards.appendleft(bird)
+
+    def n_captured(self, bird, side):
+        '''Number of cards captured by laying birds of type bird on the given
+        side ('left' or 'right'): the cards between the laid birds and the
+        nearest bird of the same type. 0 means that the lay captures nothing.
+        '''
+        positions = self._positions[BIRD_INDEX[bird]]
+        if not positions:
+            return 0
+        if side == 'right':
+            return self._left + len(self._cards) - 1 - positions[-1]
+        return positions[0] - self._left
+
+    def captured(self, bird, side):
+        '''List of the cards captured by laying birds of type bird on the given
+        side, from the nearest bird of the same type outwards.
+        '''
+        n = self.n_captured(bird, side)
+        if side == 'right':
+            return [self._cards[i - n] for i in range(n)]
+        return [self._cards[n - 1 - i] for i in range(n)]
+
+    def lay(self, bird, n, side):
+        '''Lay n birds of type bird on the given side of the row, removing the
+        cards they capture.
+
+        Returns:
+            list: The captured cards, from the nearest bird of the same type
+                outwards.
+        '''
+        out = []
+        positions = self._positions
+        if side == 'right':
+            for _ in range(self.n_captured(bird, side)):
+                card = self._cards.pop()
+                positions[BIRD_INDEX[card]].pop()
+                out.append(card)
+            for _ in range(n):
+                self.append(bird)
+        else:
+            for _ in range(self.n_captured(bird, side)):
+                card = self._cards.popleft()
+                positions[BIRD_INDEX[card]].popleft()
+                self._left += 1
+                out.append(card)
+            for _ in range(n):
+                self.appendleft(bird)
+        out.reverse()
+        return out
+
+
+class Board(dict):
+    '''The rows of the board, with row numbers as keys. Rows given as lists
+    of bird names are turned into Rows.
     '''
-    deck = {bird: atts['count'] for bird, atts in card_data.items()}
+    def __init__(self, rows=()):
+        super().__init__()
+        for n_row, row in dict(rows).items():
+            self[n_row] = row
+
+    def __setitem__(self, n_row, row):
+        if not isinstance(row, Row):
+            row = Row(row)
+        super().__setitem__(n_row, row)
 
-    return UnorderedCards(deck)
+    def copy(self):
+        board = Board()
+        for n_row, row in self.items():
+            dict.__setitem__(board, n_row, row.copy())
+        return board
 
 
-# if __name__ == '__main__':
-    # stack = UnorderedCards(list('abcabc'))
-    # hand = stack.draw(10)
-    #
-    # print(stack, hand)
+def _new(counts):
+    '''Wrap a list of counts in an UnorderedCards without copying it.
+    '''
+    stack = UnorderedCards.__new__(UnorderedCards)
+    stack._counts = counts
+    return stack
+
+def _counts_of(cards):
+    '''Return the count list of an UnorderedCards, or of anything that can be
+    turned into one.
+    '''
+    if isinstance(cards, UnorderedCards):
+        return cards._counts
+    return UnorderedCards(cards)._counts
 
-    # print(list('abcaa') in stack)
+def get_deck():
+    '''Return a UnorderedCards of all 110 cards in the game.
+    '''
+    return _new(list(COUNT))
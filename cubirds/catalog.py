@@ -0,0 +1,38 @@
+'''The catalog of bird cards, compiled once at import time.
+
+Birds are identified by their index in BIRDS, and their properties are
+stored as tuples indexed by bird so that lookups are cheap. NumPy versions
+of the tuples (COUNT_ARRAY, SMALL_ARRAY and BIG_ARRAY) are only built, and
+NumPy only imported, when first accessed.
+'''
+import json
+import os
+
+with open(os.path.join(os.path.dirname(__file__), 'card_data.json')) as file:
+    card_data = json.load(file)
+
+# Bird types in a fixed order. Stacks store one count per bird in this order.
+BIRDS = tuple(card_data)
+BIRD_INDEX = {bird: i for i, bird in enumerate(BIRDS)}
+N_BIRDS = len(BIRDS)
+
+COUNT = tuple(card_data[bird]['count'] for bird in BIRDS)
+SMALL = tuple(card_data[bird]['small'] for bird in BIRDS)
+BIG = tuple(card_data[bird]['big'] for bird in BIRDS)
+N_CARDS = sum(COUNT)
+
+# Most players supported, which sizes per-player tables.
+MAX_PLAYERS = 8
+
+_ARRAYS = {'COUNT_ARRAY': COUNT, 'SMALL_ARRAY': SMALL, 'BIG_ARRAY': BIG}
+
+
+def __getattr__(name):
+    if name not in _ARRAYS:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    import numpy as np
+
+    array = np.array(_ARRAYS[name])
+    array.setflags(write=False)
+    globals()[name] = array
+    return array
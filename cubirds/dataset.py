@@ -0,0 +1,240 @@
+'''Self-play positions stored in fixed-size records, in shards read with
+np.memmap.
+
+A dataset is a directory holding shards of at most shard_size records
+(shard_00000.bin, shard_00001.bin...) and meta.json, which lists the shards
+with their number of records. Records are only counted in meta.json once
+their game is over and written, so a sampler can read a dataset while it is
+being written, and a writer reopening a dataset drops what was written after
+the last update, including shards meta.json does not list.
+'''
+import json
+import os
+import numpy as np
+
+from .actions import encode_move, legal_mask, n_actions
+from .game import Game, encoded_size
+from .ismcts import search
+
+
+def record_dtype(n_players, n_rows):
+    '''Dtype of the records of games of that shape:
+
+    observation: Game.encode_observation of the player to move.
+    mask: Legal actions (see actions.py).
+    policy: Search policy over the actions, e.g. normalized visit counts.
+    outcome: 1 if the player to move won the game, -1 if another player won
+        and 0 for a draw.
+    game: Index of the game in the dataset.
+    turn: Turn of the position.
+    '''
+    size = n_actions(n_rows)
+    return np.dtype([
+        ('observation', 'u1', encoded_size(n_players, n_rows) + n_players + 1),
+        ('mask', '?', size),
+        ('policy', '<f4', size),
+        ('outcome', 'i1'),
+        ('game', '<u4'),
+        ('turn', '<u2'),
+    ])
+
+def _read_meta(directory):
+    with open(os.path.join(directory, 'meta.json')) as file:
+        return json.load(file)
+
+
+class DatasetWriter:
+    '''Appends the positions of played games to a dataset.
+
+    Example:
+        with DatasetWriter('selfplay', n_players=3) as writer:
+            game = Game(3, verbose=False)
+            while not game.end:
+                move, policy = choose(game)
+                writer.add_position(game, policy)
+                game.apply(move)
+            writer.end_game(game)
+    '''
+    def __init__(self, directory, n_players, n_rows=4, shard_size=2**16):
+        '''Args:
+            directory (str): Directory of the dataset, created if needed. An
+                existing dataset is appended to.
+            n_players (int): Number of players of the games.
+            n_rows (int): Number of rows of the games.
+            shard_size (int): Maximum number of records per shard.
+        '''
+        self.directory = directory
+        self.dtype = record_dtype(n_players, n_rows)
+        os.makedirs(directory, exist_ok=True)
+        params = {'n_players': n_players, 'n_rows': n_rows, 'shard_size': shard_size}
+        if os.path.exists(os.path.join(directory, 'meta.json')):
+            self.meta = _read_meta(directory)
+            if {k: self.meta[k] for k in params} != params:
+                raise ValueError('{} holds a different dataset: {}'.format(
+                    directory, {k: self.meta[k] for k in params}))
+            # Drop the records written after the last update of meta.json.
+            if self.meta['shards']:
+                name, n_records = self.meta['shards'][-1]
+                with open(os.path.join(directory, name), 'r+b') as file:
+                    file.truncate(n_records * self.dtype.itemsize)
+        else:
+            self.meta = dict(params, n_games=0, shards=[])
+        # Shards started after the last update of meta.json only hold
+        # dropped records.
+        listed = {name for name, _ in self.meta['shards']}
+        for name in os.listdir(directory):
+            if name.startswith('shard_') and name.endswith('.bin') and name not in listed:
+                os.remove(os.path.join(directory, name))
+        self._positions = []
+
+    @property
+    def n_records(self):
+        return sum(n_records for _, n_records in self.meta['shards'])
+
+    def add_position(self, game, policy):
+        '''Record the current position of game, before its move is played.
+
+        Args:
+            game (Game): The game.
+            policy (array-like): Probability of each action (see actions.py)
+                according to the search.
+        '''
+        self._positions.append((
+            game.encode_observation(game.current_player), legal_mask(game),
+            policy, game.current_player, game.current_turn))
+
+    def end_game(self, game):
+        '''Write the positions recorded since the last game with the outcome
+        of game, which must be over.
+        '''
+        assert game.end, 'The game is not over.'
+        records = np.zeros(len(self._positions), dtype=self.dtype)
+        for i, (observation, mask, policy, player, turn) in enumerate(self._positions):
+            records[i]['observation'] = np.frombuffer(observation, dtype=np.uint8)
+            records[i]['mask'] = mask
+            records[i]['policy'] = policy
+            records[i]['outcome'] = 0 if game.winner is None else 1 if game.winner == player else -1
+            records[i]['turn'] = turn
+        records['game'] = self.meta['n_games']
+        self._positions = []
+        self._write(records)
+        self.meta['n_games'] += 1
+        self._write_meta()
+
+    def _write(self, records):
+        shards = self.meta['shards']
+        while len(records):
+            if not shards or shards[-1][1] == self.meta['shard_size']:
+                shards.append(['shard_{:05d}.bin'.format(len(shards)), 0])
+            name, n_records = shards[-1]
+            chunk = records[:self.meta['shard_size'] - n_records]
+            with open(os.path.join(self.directory, name), 'ab') as file:
+                file.write(chunk.tobytes())
+            shards[-1][1] += len(chunk)
+            records = records[len(chunk):]
+
+    def _write_meta(self):
+        path = os.path.join(self.directory, 'meta.json')
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.meta, file)
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        '''Forget the positions of an unfinished game.'''
+        self._positions = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DatasetSampler:
+    '''Draws random minibatches of records from every shard of a dataset.
+
+    Shards are memory-mapped, so only the pages holding the sampled records
+    are read from disk.
+
+    Example:
+        sampler = DatasetSampler('selfplay', rng=0)
+        batch = sampler.sample(256)
+        train(batch['observation'], batch['mask'], batch['policy'], batch['outcome'])
+    '''
+    def __init__(self, directory, rng=None):
+        '''Args:
+            directory (str): Directory of the dataset.
+            rng (np.random.Generator or int): Source of the samples, or a seed.
+        '''
+        self.directory = directory
+        self.rng = np.random.default_rng(rng)
+        self._maps = {}
+        self.refresh()
+
+    def refresh(self):
+        '''Pick up the records written since the sampler was created.'''
+        meta = _read_meta(self.directory)
+        self.dtype = record_dtype(meta['n_players'], meta['n_rows'])
+        self.shards = [(name, n_records) for name, n_records in meta['shards'] if n_records]
+        self._starts = np.cumsum([0] + [n_records for _, n_records in self.shards])
+        self._maps = {}
+
+    def __len__(self):
+        return int(self._starts[-1])
+
+    def shard(self, i):
+        '''Memory map of the records of shard i.'''
+        name, n_records = self.shards[i]
+        if name not in self._maps:
+            self._maps[name] = np.memmap(os.path.join(self.directory, name),
+                                         dtype=self.dtype, mode='r', shape=(n_records,))
+        return self._maps[name]
+
+    def sample(self, batch_size):
+        '''Return batch_size records drawn uniformly with replacement, as a
+        structured array (see record_dtype).
+        '''
+        indices = self.rng.integers(0, len(self), batch_size)
+        shards = np.searchsorted(self._starts, indices, side='right') - 1
+        out = np.empty(batch_size, dtype=self.dtype)
+        for i in np.unique(shards):
+            selected = np.flatnonzero(shards == i)
+            out[selected] = self.shard(i)[indices[selected] - self._starts[i]]
+        return out
+
+
+def search_policy(game, iterations=100, rng=None):
+    '''Search the current position of game with ISMCTS.
+
+    Returns:
+        The most visited move, in the format of Game.apply.
+        ndarray: The visit counts of the root moves as a probability over
+            the actions.
+    '''
+    results, _ = search(game, iterations=iterations, rng=rng)
+    policy = np.zeros(n_actions(game.n_rows), dtype=np.float32)
+    for move, (visits, _) in results.items():
+        policy[encode_move(move, game.current_phase, game.n_rows)] = visits
+    policy /= policy.sum()
+    move = max(results, key=lambda move: results[move][0])
+    return move, policy
+
+def selfplay(writer, n_games, iterations=100, seed=None):
+    '''Play n_games with ISMCTS for every player and record their positions.
+
+    Args:
+        writer (DatasetWriter): Where to write the positions.
+        n_games (int): Number of games.
+        iterations (int): ISMCTS iterations per move.
+        seed (int): Seed of the games and searches.
+    '''
+    seeds = np.random.SeedSequence(seed)
+    meta = writer.meta
+    for game_seed, search_seed in zip(seeds.spawn(n_games), seeds.spawn(n_games)):
+        game = Game(meta['n_players'], meta['n_rows'], verbose=False, rng=game_seed)
+        rng = np.random.default_rng(search_seed)
+        while not game.end:
+            move, policy = search_policy(game, iterations, rng)
+            writer.add_position(game, policy)
+            game.apply(move)
+        writer.end_game(game)
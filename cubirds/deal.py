@@ -0,0 +1,126 @@
+from collections import namedtuple
+import numpy as np
+
+from .catalog import COUNT_ARRAY as COUNT, N_BIRDS
+from .game import Game
+
+Deal = namedtuple('Deal', ['deck', 'discard', 'hands', 'collections', 'board'])
+Deal.__doc__ = '''Opening states of a batch of games, as arrays of bird counts
+(in BIRDS order) and bird indices.
+
+Attributes:
+    deck (ndarray): (n_games, N_BIRDS) cards remaining in the deck.
+    discard (ndarray): (n_games, N_BIRDS) duplicates discarded while dealing
+                       the board.
+    hands (ndarray): (n_games, n_players, N_BIRDS) 8 cards per player.
+    collections (ndarray): (n_games, n_players, N_BIRDS) 1 card per player.
+    board (ndarray): (n_games, n_rows, 3) three different birds per row.
+'''
+
+
+def deal_batch(n_games, n_players=4, n_rows=4, rng=None):
+    '''Deal the opening state of n_games games at once.
+
+    Each game's deck is shuffled, then cards are dealt from the top like in
+    Game.__init__: 8 cards per hand, 1 card per collection, then rows are
+    filled with cards until they hold three different birds, duplicates being
+    discarded. Finally the birds of each row are shuffled.
+
+    Args:
+        n_games (int): The number of games to deal.
+        n_players (int): The number of players in each game.
+        n_rows (int): The number of rows on each board.
+        rng (np.random.Generator): Defaults to a freshly seeded generator.
+
+    Returns:
+        Deal: The opening states.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    cards = np.repeat(np.arange(N_BIRDS, dtype=np.int8), COUNT)
+    order = rng.permuted(np.broadcast_to(cards, (n_games, len(cards))), axis=1)
+
+    n_dealt = 8 * n_players
+    hands = _count(order[:, :n_dealt].reshape(n_games, n_players, 8))
+    collections = _count(order[:, n_dealt:n_dealt + n_players, None])
+
+    # Fill rows one card at a time in every game, discarding birds which are
+    # already in the row being filled.
+    board = np.empty((n_games, n_rows, 3), dtype=np.int8)
+    discard = np.zeros((n_games, N_BIRDS), dtype=np.int64)
+    n_row = np.zeros(n_games, dtype=np.int64)
+    n_filled = np.zeros(n_games, dtype=np.int64)
+    seen = np.zeros((n_games, N_BIRDS), dtype=bool)
+    position = np.full(n_games, n_dealt + n_players)
+    games = np.arange(n_games)
+    while len(games):
+        birds = order[games, position[games]]
+        position[games] += 1
+        dupe = seen[games, birds]
+        discard[games[dupe], birds[dupe]] += 1
+
+        filling, birds = games[~dupe], birds[~dupe]
+        board[filling, n_row[filling], n_filled[filling]] = birds
+        seen[filling, birds] = True
+        n_filled[filling] += 1
+
+        full = filling[n_filled[filling] == 3]
+        n_row[full] += 1
+        n_filled[full] = 0
+        seen[full] = False
+        games = games[n_row[games] < n_rows]
+
+    board = rng.permuted(board, axis=2)
+    deck = (COUNT - hands.sum(1) - collections.sum(1)
+            - _count(board).sum(1) - discard)
+
+    return Deal(deck, discard, hands, collections, board)
+
+def _count(cards):
+    '''Turn an array of bird indices (..., n_cards) into bird counts
+    (..., N_BIRDS).
+    '''
+    return (cards[..., None] == np.arange(N_BIRDS)).sum(-2)
+
+
+class DealPool:
+    '''A reusable pool of opening states. Deals are generated in batches with
+    deal_batch and handed out one game at a time; the pool refills itself when
+    it runs out.
+
+    Example:
+        pool = DealPool(n_players=3)
+        for _ in range(1000):
+            game = pool.next_game(verbose=False)
+            playout(game)
+    '''
+    def __init__(self, n_players=4, n_rows=4, size=4096, rng=None):
+        '''Args:
+            n_players (int): The number of players in each game.
+            n_rows (int): The number of rows on each board.
+            size (int): The number of games dealt at once.
+            rng (np.random.Generator): Defaults to a freshly seeded generator.
+        '''
+        self.n_players = n_players
+        self.n_rows = n_rows
+        self.size = size
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.deal = None
+        self.position = size
+
+    def __len__(self):
+        '''Number of deals left before the next refill.'''
+        return self.size - self.position
+
+    def refill(self):
+        self.deal = deal_batch(self.size, self.n_players, self.n_rows, self.rng)
+        self.position = 0
+
+    def next_game(self, verbose=True):
+        '''Return a new Game from the next deal in the pool. Games share the
+        random number generator of the pool.
+        '''
+        if self.position >= self.size:
+            self.refill()
+        game = Game.from_deal(self.deal, self.position, verbose=verbose, rng=self.rng)
+        self.position += 1
+        return game
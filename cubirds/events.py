@@ -0,0 +1,111 @@
+from collections import deque, namedtuple
+
+Deal = namedtuple('Deal', ['hands', 'collections', 'board'])
+Deal.__doc__ = '''The opening deal of a game.
+
+Attributes:
+    hands (tuple): The bird names in each player's hand.
+    collections (tuple): The bird names in each player's collection.
+    board (tuple): The bird names of each row, from left to right.
+'''
+
+Lay = namedtuple('Lay', ['player', 'bird', 'n_birds', 'n_row', 'side', 'captured'])
+Lay.__doc__ = '''A player laid birds on a row.
+
+Attributes:
+    player (int): The player who laid the birds.
+    bird (str): The bird type laid.
+    n_birds (int): The number of birds laid.
+    n_row (int): The row.
+    side (str): 'left' or 'right'.
+    captured (tuple): The bird names captured, empty if none.
+'''
+
+Draw = namedtuple('Draw', ['player', 'cards'])
+Draw.__doc__ = '''A player drew cards after a lay which captured nothing.
+
+Attributes:
+    player (int): The player who drew.
+    cards (tuple): The bird names drawn.
+'''
+
+Reshuffle = namedtuple('Reshuffle', ['n_cards'])
+Reshuffle.__doc__ = '''The deck ran out and the discard pile became the deck.
+
+Attributes:
+    n_cards (int): The number of cards in the new deck.
+'''
+
+CompleteRow = namedtuple('CompleteRow', ['n_row', 'cards'])
+CompleteRow.__doc__ = '''Cards were added to a row which held a single bird type.
+
+Attributes:
+    n_row (int): The row.
+    cards (tuple): The bird names added on the right of the row.
+'''
+
+Flock = namedtuple('Flock', ['player', 'bird', 'kind', 'n_birds'])
+Flock.__doc__ = '''A player made a flock.
+
+Attributes:
+    player (int): The player who made the flock.
+    bird (str): The bird type of the flock.
+    kind (str): 'small' (one bird collected) or 'big' (two birds collected).
+    n_birds (int): The number of birds in the flock. The ones which are not
+                   collected are discarded.
+'''
+
+RoundEnd = namedtuple('RoundEnd', ['turn', 'n_discarded', 'hands'])
+RoundEnd.__doc__ = '''A player emptied their hand, so every hand was discarded and
+redealt.
+
+Attributes:
+    turn (int): The current turn.
+    n_discarded (int): The number of cards discarded from the hands.
+    hands (tuple): The bird names in each player's new hand.
+'''
+
+GameEnd = namedtuple('GameEnd', ['winner', 'reason'])
+GameEnd.__doc__ = '''The game ended.
+
+Attributes:
+    winner (int): The winner, or None if the game ended in a draw.
+    reason (str): The win condition met ('species' for seven species,
+                  'triples' for three birds of two species), or 'no cards'
+                  if a draw was impossible because the deck and the discard
+                  pile ran out.
+'''
+
+EVENTS = (Deal, Lay, Draw, Reshuffle, CompleteRow, Flock, RoundEnd, GameEnd)
+
+
+class EventLog:
+    '''Records the events of games. Pass it as the on_event argument of Game.
+
+    With maxlen, only the last maxlen events are kept, so that a log can stay
+    attached to a long run and be inspected when something odd happens.
+
+    Example:
+        log = EventLog(maxlen=1000)
+        game = Game(3, verbose=False, on_event=log)
+        playout(game)
+        print(log.of_type(GameEnd))
+    '''
+    def __init__(self, maxlen=None):
+        self.events = deque(maxlen=maxlen)
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def of_type(self, *types):
+        '''List the recorded events of the given types.'''
+        return [event for event in self.events if isinstance(event, types)]
+
+    def clear(self):
+        self.events.clear()
@@ -1,8 +1,53 @@
+from collections import namedtuple
 import numpy as np
-from random import shuffle
 
-from ..utils import card_data
-from .cards import UnorderedCards, get_deck
+from . import profiling
+from .actions import decode_action, n_lay_actions
+from .cards import Board, Row, UnorderedCards, get_deck
+from .catalog import BIG, BIRD_INDEX, BIRDS, COUNT, N_BIRDS, N_CARDS, SMALL, SMALL_ARRAY
+from .events import CompleteRow, Deal, Draw, Flock, GameEnd, Lay, Reshuffle, RoundEnd
+from .transposition import (DECK, DISCARD, check_size, collection_zone, hand_zone,
+                            row_zone, turn_key, zone_hash, zones)
+
+UndoRecord = namedtuple('UndoRecord', [
+    'phase', 'player', 'turn', 'end', 'winner', 'deck', 'discard', 'hands',
+    'hand', 'collection', 'n_row', 'row', 'hashes', 'hidden'])
+
+# Binary encoding of a game (see Game.encode), one byte per field unless
+# stated otherwise:
+#   n_players, n_rows, current_player, phase (0 for lay, 1 for flock),
+#   current_turn (2 bytes, little-endian), end, winner (255 for none),
+#   deck counts (N_BIRDS), discard counts (N_BIRDS),
+#   hand counts (n_players * N_BIRDS), collection counts (n_players * N_BIRDS),
+#   row lengths (n_rows),
+#   board (BOARD_BYTES): the bird indices of all rows, one row after the
+#   other, two per byte with the first in the high nibble, padded with 0xf.
+HEADER_BYTES = 8
+BOARD_BYTES = (N_CARDS + 1) // 2
+NO_WINNER = 255
+PHASES = ('lay', 'flock')
+
+
+def encoded_size(n_players, n_rows):
+    '''Size in bytes of Game.encode() for games of that shape.'''
+    return HEADER_BYTES + (2 + 2 * n_players) * N_BIRDS + n_rows + BOARD_BYTES
+
+def _pack_board(board, n_rows):
+    cards = [BIRD_INDEX[bird] for n_row in range(n_rows) for bird in board[n_row]]
+    cards += [0xf] * (2 * BOARD_BYTES - len(cards))
+    return [high << 4 | low for high, low in zip(cards[::2], cards[1::2])]
+
+def _unpack_board(packed, lengths):
+    cards = []
+    for byte in packed:
+        cards += (byte >> 4, byte & 0xf)
+    board = Board()
+    start = 0
+    for n_row, length in enumerate(lengths):
+        board[n_row] = [BIRDS[i] for i in cards[start:start + length]]
+        start += length
+    return board
+
 
 class Game:
     '''A class representing a game of Cubirds.
@@ -22,37 +67,248 @@ class Game:
                                 hands as values.
         collections (dict of UnorderedCardss): dict with player numbers as keys and
                                       player collections as values.
-        board (dict of lists of strings): rows on the board. Represented as
-                                          lists because their order matters.
+        board (Board): rows on the board, with row numbers as keys. Rows are
+                       Rows because their order matters.
 
         end (bool): Whether the game has ended or not.
         winner (int): if end, can be int to signify the winner or None if the
                       game ended in a draw.
+
+        rng (np.random.Generator): The game's generator, which agents
+                                   like random_moves.random_turn use by
+                                   default.
+        deck_rng (np.random.Generator): Source of the cards (dealing, drawing
+                                        and reshuffling). The same object as
+                                        rng unless the game was created with
+                                        a deck_rng.
+        on_event (callable): Called with every event of the game (see
+                             events.py), or None to record nothing.
     '''
-    def __init__(self, n_players=4, n_rows=4, verbose=True):
+    def __init__(self, n_players=4, n_rows=4, verbose=True, rng=None, on_event=None,
+                 deck_rng=None):
         '''Initialize a game of Cubirds.
 
         Args:
             n_players: The number of players.
             n_rows: The number of rows on the board. Defaults to 4.
             verbose (bool): Whether to print text without being asked.
+            rng (np.random.Generator or int): The game's random number
+                generator, or a seed to create one. Defaults to a freshly
+                seeded generator.
+            on_event (callable): Hook called with each event of the game,
+                e.g. an events.EventLog. Games without a hook only pay a
+                check against None.
+            deck_rng (np.random.Generator or int): A separate generator (or
+                seed) for the cards, so that the deal and every draw stay the
+                same whatever randomness the players use. Defaults to rng.
         '''
-        self.n_players = n_players
-        self.current_turn = 0
-        self.current_player = 0
-        self.current_phase = 'lay'
-        self.n_rows = n_rows
-        self.verbose = verbose
+        self._init_state(n_players, n_rows, verbose, rng, deck_rng)
+        self.on_event = on_event
 
         self.deck = get_deck()
         self.discard = UnorderedCards()
         self.hands = self._init_hands()
         self.collections = self._init_collections()
         self.board = self._init_board()
+        self.recount_unseen()
+
+        if on_event is not None:
+            on_event(Deal(
+                tuple(tuple(self.hands[p]) for p in range(n_players)),
+                tuple(tuple(self.collections[p]) for p in range(n_players)),
+                tuple(tuple(self.board[n_row]) for n_row in range(n_rows))))
+
+    @classmethod
+    def from_deal(cls, deal, i=0, verbose=True, rng=None):
+        '''Create a game from an opening state made by deal.deal_batch.
+
+        Args:
+            deal (Deal): A batch of opening states.
+            i (int): The index of the game to use in the batch.
+            verbose (bool): Whether to print text without being asked.
+            rng (np.random.Generator or int): As in Game.__init__.
+        '''
+        game = cls.__new__(cls)
+        n_players, n_rows = deal.hands.shape[1], deal.board.shape[1]
+        game._init_state(n_players, n_rows, verbose, rng)
+
+        hands, collections = deal.hands[i].tolist(), deal.collections[i].tolist()
+        game.deck = UnorderedCards.from_counts(deal.deck[i].tolist())
+        game.discard = UnorderedCards.from_counts(deal.discard[i].tolist())
+        game.hands = {player: UnorderedCards.from_counts(hands[player])
+                      for player in range(n_players)}
+        game.collections = {player: UnorderedCards.from_counts(collections[player])
+                            for player in range(n_players)}
+        game.board = Board({n_row: [BIRDS[bird] for bird in row]
+                            for n_row, row in enumerate(deal.board[i].tolist())})
+        game.recount_unseen()
+
+        return game
+
+    def _init_state(self, n_players, n_rows, verbose, rng, deck_rng=None):
+        self.rng = np.random.default_rng(rng)
+        self.deck_rng = self.rng if deck_rng is None else np.random.default_rng(deck_rng)
+        self.n_players = n_players
+        self.current_turn = 0
+        self.current_player = 0
+        self.current_phase = 'lay'
+        self.n_rows = n_rows
+        self.verbose = verbose
 
         self.end = False
         self.winner = None
+        self.on_event = None
 
+        self._hashes = None
+        self._hash = 0
+        # Counts of the cards in the deck or in any hand, kept up to date by
+        # every move (see unseen_counts).
+        self._hidden = [0] * N_BIRDS
+
+    def enable_hashing(self):
+        '''Start maintaining the Zobrist hash of the game (see hash)
+        incrementally: every move only rehashes the zones (deck, discard,
+        hands, collections and rows) it changed.
+
+        Call it again after modifying the game from outside its methods.
+
+        Raises:
+            ValueError: If the game is too large to hash (see
+                transposition.MAX_PLAYERS and MAX_ROWS).
+        '''
+        check_size(self)
+        self._hashes = [0] * (row_zone(self.n_rows))
+        self._hash = 0
+        for zone in zones(self):
+            self._hashes[zone] = zone_hash(self, zone)
+            self._hash ^= self._hashes[zone]
+
+    def _update_hash(self, *changed):
+        if self._hashes is None:
+            return
+        for zone in changed:
+            h = zone_hash(self, zone)
+            self._hash ^= self._hashes[zone] ^ h
+            self._hashes[zone] = h
+
+    @property
+    def hash(self):
+        '''Zobrist hash of the position: the card counts of the deck, discard,
+        hands and collections, the sequence of every row, the current player
+        and the current phase. Positions reached by different move orders
+        have the same hash.
+
+        Computed from scratch unless enable_hashing was called. Raises a
+        ValueError for games too large to hash, like enable_hashing.
+        '''
+        if self._hashes is None:
+            check_size(self)
+            h = 0
+            for zone in zones(self):
+                h ^= zone_hash(self, zone)
+            return h ^ turn_key(self)
+        return self._hash ^ turn_key(self)
+
+    def clone(self):
+        '''Return an independent copy of the game. Much faster than
+        copy.deepcopy since only the card stacks and rows need copying.
+        The copy shares the random number generator of the game and has no
+        event hook.
+        '''
+        game = self.__class__.__new__(self.__class__)
+        game.__dict__.update(self.__dict__)
+        game.deck = self.deck.copy()
+        game.discard = self.discard.copy()
+        game.hands = {player: hand.copy() for player, hand in self.hands.items()}
+        game.collections = {player: collection.copy()
+                            for player, collection in self.collections.items()}
+        game.board = self.board.copy()
+        game.on_event = None
+        game._hidden = self._hidden[:]
+        if self._hashes is not None:
+            game._hashes = self._hashes[:]
+
+        return game
+
+    def encode(self):
+        '''Pack the full state of the game into encoded_size(n_players,
+        n_rows) bytes. The random number generator is not encoded.
+        '''
+        players = range(self.n_players)
+        out = [
+            self.n_players, self.n_rows, self.current_player,
+            PHASES.index(self.current_phase),
+            self.current_turn & 0xff, self.current_turn >> 8,
+            self.end, NO_WINNER if self.winner is None else self.winner,
+        ]
+        out += self.deck.counts
+        out += self.discard.counts
+        for player in players:
+            out += self.hands[player].counts
+        for player in players:
+            out += self.collections[player].counts
+        out += [len(self.board[n_row]) for n_row in range(self.n_rows)]
+        out += _pack_board(self.board, self.n_rows)
+        return bytes(out)
+
+    def encode_observation(self, player):
+        '''Pack what player can see into encoded_size(n_players, n_rows) +
+        n_players + 1 bytes.
+
+        The layout is the one of encode, except that the deck counts are the
+        counts of all the cards unseen by player (the deck and the other
+        players' hands), the other players' hand counts are zeros, and the
+        observing player and the size of every hand are appended.
+        '''
+        players = range(self.n_players)
+        out = bytearray(self.encode())
+        start = HEADER_BYTES
+        out[start:start + N_BIRDS] = bytes(self.unseen_counts(player))
+        start += 2 * N_BIRDS
+        for p in players:
+            if p != player:
+                out[start + p * N_BIRDS:start + (p + 1) * N_BIRDS] = bytes(N_BIRDS)
+        out.append(player)
+        out += bytes(len(self.hands[p]) for p in players)
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, buf, verbose=False, rng=None):
+        '''Rebuild a game from the output of encode.
+
+        Args:
+            buf (bytes-like): An encoded game, e.g. bytes or a uint8 array.
+            verbose (bool): Whether to print text without being asked.
+            rng (np.random.Generator or int): As in Game.__init__.
+        '''
+        buf = bytes(buf)
+        n_players, n_rows = buf[0], buf[1]
+        game = cls.__new__(cls)
+        game._init_state(n_players, n_rows, verbose, rng)
+        game.current_player = buf[2]
+        game.current_phase = PHASES[buf[3]]
+        game.current_turn = buf[4] | buf[5] << 8
+        game.end = bool(buf[6])
+        game.winner = None if buf[7] == NO_WINNER else buf[7]
+
+        def counts():
+            nonlocal start
+            start += N_BIRDS
+            return UnorderedCards.from_counts(buf[start - N_BIRDS:start])
+
+        start = HEADER_BYTES
+        game.deck = counts()
+        game.discard = counts()
+        game.hands = {player: counts() for player in range(n_players)}
+        game.collections = {player: counts() for player in range(n_players)}
+        lengths = buf[start:start + n_rows]
+        start += n_rows
+        game.board = _unpack_board(buf[start:start + BOARD_BYTES], lengths)
+        game.recount_unseen()
+
+        return game
+
+    @profiling.timed()
     def draw(self, n=1):
         '''Remove the first n cards from the deck and return them.
         If draw is impossible, draw until deck is empty, then shuffle the
@@ -61,16 +317,29 @@ class Game:
         end the game in a draw.
         '''
         if len(self.deck) >= n:
-            hand = self.deck.draw(n)
+            hand = self.deck.draw(n, self.deck_rng)
         else:
             if len(self.deck) + len(self.discard) >= n:
                 hand = self.deck
                 self.deck = self.discard
                 self.discard = UnorderedCards()
+                hidden = self._hidden
+                for i, count in enumerate(self.deck.counts):
+                    hidden[i] += count
+                if self.on_event is not None:
+                    self.on_event(Reshuffle(len(self.deck)))
+                if profiling.enabled:
+                    profiling.count('reshuffles')
                 hand = hand + self.draw(n-len(hand))
             else:
-                self._end_game()
-                return self.deck + self.discard
+                # The player takes what is left and the game ends.
+                hand = self.deck + self.discard
+                hidden = self._hidden
+                for i, count in enumerate(self.discard.counts):
+                    hidden[i] += count
+                self.deck = UnorderedCards()
+                self.discard = UnorderedCards()
+                self._end_game('no cards')
 
         return hand
 
@@ -88,37 +357,49 @@ class Game:
 
         return collections
 
+    @profiling.timed()
     def _init_board(self):
         '''Initialize the game board with n_rows rows.
-        Each row is a list of strings (not a UnorderedCards) because rows must be
-        ordered.
+        Each row is a Row (not a UnorderedCards) because rows must be ordered.
         '''
-        board = {}
+        board = Board()
         for n_row in range(self.n_rows):
             row = self.draw(3)
             while row.n_unique() < 3:
+                if profiling.enabled:
+                    profiling.count('init_board redraws')
                 row, dupes = row.dedupe()
                 self.discard += dupes
                 row += self.draw(1)
             # Now switching to a list because rows must be ordered.
             row = row.l
-            shuffle(row)
+            self.deck_rng.shuffle(row)
             board[n_row] = row
 
         return board
 
+    @profiling.timed()
     def _complete_row(self, n_row):
         '''Complete the selected row by adding cards from the deck until at
         least two bird types are represented.
         '''
         row = self.board[n_row]
-        while UnorderedCards(row).n_unique() < 2:
+        length = len(row)
+        while row.n_unique() < 2:
+            if profiling.enabled:
+                profiling.count('complete_row draws')
             draw = self.draw(1)
             if not draw.empty:
-                row += draw.l
+                for bird in draw:
+                    row.append(bird)
+                    self._hidden[BIRD_INDEX[bird]] -= 1
             else:
                 break
-        self.board[n_row] = row
+
+        if self.on_event is not None and len(row) > length:
+            self.on_event(CompleteRow(n_row, tuple(row[length:])))
+
+        self._update_hash(row_zone(n_row), DECK, DISCARD)
 
     def _next_turn(self):
         self.current_player += 1
@@ -133,17 +414,37 @@ class Game:
         Resets the current player's turn (puts them back at 'lay' phase).
         '''
         # self.discard += sum(self.hands.values())
+        n_discarded = 0
+        hidden = self._hidden
         for h in self.hands.values():
+            n_discarded += len(h)
             self.discard += h
+            for i, count in enumerate(h.counts):
+                hidden[i] -= count
 
 
         self.hands = self._init_hands()
         self.current_phase = 'lay'
 
-    def _end_game(self):
+        if self.on_event is not None:
+            self.on_event(RoundEnd(self.current_turn, n_discarded,
+                                   tuple(tuple(self.hands[p]) for p in range(self.n_players))))
+
+        self._update_hash(DECK, DISCARD, *(hand_zone(p) for p in range(self.n_players)))
+
+    def _end_game(self, reason):
+        if self.end:
+            # A lay can fail to draw several times once the cards ran out.
+            return
         self.end = True
+        if profiling.enabled:
+            profiling.count('games')
+            if reason == 'no cards':
+                profiling.count('draw-ended games')
+        if self.on_event is not None:
+            self.on_event(GameEnd(self.winner, reason))
         if self.verbose:
-            if self.winner:
+            if self.winner is not None:
                 print('\nThe game has ended!')
                 print('The winner is: player {}!'.format(self.winner))
             else:
@@ -156,13 +457,17 @@ class Game:
         '''Checks if a given collection is a winning one.
         There are two win conditions: having seven different species or having
         at least three of two different species.
+
+        Returns:
+            str: 'species' or 'triples' for a winning collection, depending on
+                the condition met, else None.
         '''
         if collection.n_unique() >= 7:
-            return True
+            return 'species'
         elif len([c for c in collection.values() if c >= 3]) >= 2:
-            return True
+            return 'triples'
         else:
-            return False
+            return None
 
     def state_summary(self):
         def indent_string(s):
@@ -246,19 +551,43 @@ class Game:
         self.collections[self.current_player] = value
     current_collection = property(get_current_collection, set_current_collection)
 
+    def recount_unseen(self):
+        '''Count the cards in the deck and in the hands from scratch.
+
+        Moves keep the count up to date, so this is only needed after
+        modifying the game from outside its methods.
+        '''
+        hidden = list(self.deck.counts)
+        for hand in self.hands.values():
+            for i, count in enumerate(hand.counts):
+                hidden[i] += count
+        self._hidden = hidden
+
+    def unseen_counts(self, player):
+        '''Count the cards the given player cannot see: the cards in the deck
+        and in the other players' hands. Takes constant time, since the cards
+        in the deck or in any hand are counted as they move.
+
+        Returns:
+            tuple: The count of each bird, in BIRDS order.
+        '''
+        return tuple([h - c for h, c in zip(self._hidden, self.hands[player].counts)])
+
     def invisible(self, player):
         '''Returns the UnorderedCards of cards invisible to the given player, that is:
         cards in other players' hands or in the deck.
         '''
-        return sum(self.hands) - self.current_hand + self.deck
+        return UnorderedCards.from_counts(self.unseen_counts(player))
 
     def visible(self, player):
         '''Returns the UnorderedCards of cards visible to the given player, that is:
         cards in his own hand, on the board, in collections or in the discard
         pile.
         '''
-        return get_deck() - self.invisible(player)
+        return UnorderedCards.from_counts(
+            [n - u for n, u in zip(COUNT, self.unseen_counts(player))])
 
+    @profiling.timed()
     def lay(self, bird, n_row, side, draw=True):
         '''Lay all of your cards of type 'bird' on a given row and side.
         Args:
@@ -270,31 +599,114 @@ class Game:
         '''
         assert bird in self.current_hand, 'You do not have any {} to lay!'.format(bird)
         assert self.current_phase == 'lay', 'Now is not the time to lay birds!'
+        if profiling.enabled:
+            profiling.count('moves')
+
+        n_birds = self.current_hand.draw_all(bird)[bird]
+        captured = self.board[n_row].lay(bird, n_birds, side)
+        hidden = self._hidden
+        hidden[BIRD_INDEX[bird]] -= n_birds
+        for captured_bird in captured:
+            hidden[BIRD_INDEX[captured_bird]] += 1
+
+        if self.on_event is not None:
+            self.on_event(Lay(self.current_player, bird, n_birds, n_row, side, tuple(captured)))
+
+        # If the bird is absent from the row or is present at the very end of
+        # the chosen side, nothing is captured.
+        if captured:
+            self.current_hand += captured
+        elif draw:
+            drawn = self.draw(2)
+            self.current_hand += drawn
+            if self.on_event is not None and not self.end:
+                self.on_event(Draw(self.current_player, tuple(drawn)))
 
-        to_lay = self.current_hand.draw_all(bird).l
+        self._complete_row(n_row)
+        self._update_hash(hand_zone(self.current_player))
 
-        # For the sake of readability, we assume that cards are always put on
-        # the right of the row. If the left is chosen, we reverse the row at the
-        # start then reverse it again at the end of the process.
+        self.current_phase = 'flock'
 
-        row = self.board[n_row] if side == 'right' else list(reversed(self.board[n_row]))
+    def apply(self, move):
+        '''Play a move for the current player and return a record of what it
+        changed, which undo can use to restore the game as it was.
 
-        bird_ix = [i for i, x in enumerate(row) if x == bird]
+        Args:
+            move: In the 'lay' phase, a (bird, n_row, side) tuple like the keys
+                of game_analysis.available_lays. In the 'flock' phase, a bird
+                name or None, like the argument of flock.
 
-        # If the bird is absent from the row or is present at the very right
-        if (not bird_ix) or (len(row) - 1 in bird_ix):
-            if draw:
-                self.current_hand += self.draw(2)
+        Returns:
+            UndoRecord: The state of everything the move can modify.
+        '''
+        player = self.current_player
+        n_row = move[1] if self.current_phase == 'lay' else None
+        record = UndoRecord(
+            self.current_phase, player, self.current_turn, self.end, self.winner,
+            self.deck.counts, self.discard.counts,
+            # Starting a new round replaces all hands, so keep the old ones.
+            dict(self.hands), self.hands[player].counts,
+            self.collections[player].counts,
+            n_row, None if n_row is None else self.board[n_row].copy(),
+            None if self._hashes is None else (self._hashes[:], self._hash),
+            self._hidden[:])
+
+        if self.current_phase == 'lay':
+            self.lay(*move)
         else:
-            self.current_hand += row[bird_ix[-1]+1:]
-            row = row[:bird_ix[-1]+1]
+            self.flock(move)
 
-        row = row + to_lay
-        self.board[n_row] = row if side == 'right' else list(reversed(row))
-        self._complete_row(n_row)
+        return record
 
-        self.current_phase = 'flock'
+    def legal_lay_mask(self):
+        '''Boolean array of the n_lay_actions(n_rows) lays (see actions.py),
+        True for those the current player can make: every row and side is
+        open to every bird in hand.
+        '''
+        return np.repeat(np.array(self.current_hand.counts) > 0, 2 * self.n_rows)
 
+    def legal_flock_mask(self):
+        '''Boolean array of the flocks of each bird then passing (see
+        actions.py), True for those the current player can make.
+        '''
+        mask = np.ones(N_BIRDS + 1, dtype=bool)
+        mask[:N_BIRDS] = np.array(self.current_hand.counts) >= SMALL_ARRAY
+        return mask
+
+    def step(self, action):
+        '''Play a move given as an integer action (see actions.py), like
+        apply.
+
+        Returns:
+            UndoRecord: As returned by apply.
+        '''
+        is_lay = action < n_lay_actions(self.n_rows)
+        assert is_lay == (self.current_phase == 'lay'), \
+            'Action {} cannot be played in the {} phase.'.format(action, self.current_phase)
+        return self.apply(decode_action(action, self.n_rows))
+
+    def undo(self, record):
+        '''Restore the game to its state before the move which returned
+        record. Moves must be undone in the reverse order they were applied.
+        '''
+        self.current_phase = record.phase
+        self.current_player = record.player
+        self.current_turn = record.turn
+        self.end = record.end
+        self.winner = record.winner
+
+        self.deck.counts = record.deck
+        self.discard.counts = record.discard
+        self.hands = record.hands
+        self.hands[record.player].counts = record.hand
+        self.collections[record.player].counts = record.collection
+        if record.n_row is not None:
+            self.board[record.n_row] = record.row
+        if record.hashes is not None:
+            self._hashes, self._hash = record.hashes
+        self._hidden = record.hidden
+
+    @profiling.timed()
     def flock(self, bird=None):
         '''Makes a flock (small or big) out of selected bird.
 
@@ -304,21 +716,34 @@ class Game:
         '''
         assert self.current_phase == 'flock', 'Now is not the time to flock birds!'
 
+        if self.end:
+            # The game ended in a draw while laying.
+            return
+
         if bird is not None:
-            small = card_data[bird]['small']
-            big = card_data[bird]['big']
+            small = SMALL[BIRD_INDEX[bird]]
+            big = BIG[BIRD_INDEX[bird]]
             n_birds = self.current_hand[bird]
             assert n_birds >= small, 'You need at least {} {}s to make a flock.'.format(small, bird)
 
-            self.discard += self.current_hand.draw_all('parrot')
-            if n_birds >= big:
-                self.current_collection += [bird]*2
-            else:
-                self.current_collection += [bird]
-
-        if self._check_win(self.current_collection):
+            # One (small flock) or two (big flock) of the birds go to the
+            # collection, the rest are discarded.
+            flock = self.current_hand.draw_all(bird)
+            size = 2 if n_birds >= big else 1
+            flock[bird] -= size
+            self.discard += flock
+            self.current_collection += [bird]*size
+            self._hidden[BIRD_INDEX[bird]] -= n_birds
+            self._update_hash(hand_zone(self.current_player),
+                              collection_zone(self.current_player), DISCARD)
+            if self.on_event is not None:
+                self.on_event(Flock(self.current_player, bird,
+                                    'big' if size == 2 else 'small', n_birds))
+
+        condition = self._check_win(self.current_collection)
+        if condition:
             self.winner = self.current_player
-            self._end_game()
+            self._end_game(condition)
 
         else:
             if self.current_hand.empty:
@@ -1,9 +1,16 @@
+from collections import namedtuple
 import itertools as it
+from functools import lru_cache
+from math import comb
 from timeit import default_timer as dt
 import numpy as np
 
-from ..utils import card_data, json_print
-from .cards import UnorderedCards
+from ..utils import json_print
+from . import profiling
+from .cards import Row, UnorderedCards
+from .batch import EMPTY
+from .catalog import (BIG, BIG_ARRAY, BIRD_INDEX, BIRDS, COUNT, COUNT_ARRAY, N_BIRDS,
+                      SMALL, SMALL_ARRAY)
 from .game import Game
 
 
@@ -13,44 +20,70 @@ def compute_lay(bird, row, side):
 
     Args:
         bird (str): A valid bird name.
-        row (list): A list of valid bird names.
+        row (Row or list): A row of valid bird names.
         side (str): 'left' or 'right'. The side to lay on.
     '''
-    # For the sake of readability, we assume that cards are always put on
-    # the right of the row. If the left is chosen, we reverse the row at the
-    # start then reverse it again at the end of the process.
-    row = row if side == 'right' else list(reversed(row))
+    if not isinstance(row, Row):
+        row = Row(row)
 
-    bird_ix = [i for i, x in enumerate(row) if x == bird]
-
-    # If the bird is absent from the row or is present at the very right, the
-    # outcome depends on the player's draw choice.
-    if (not bird_ix) or (len(row) - 1 in bird_ix):
-        return 'draw'
-    else:
-        return row[bird_ix[-1]+1:]
+    # If the bird is absent from the row or is present at the very end of the
+    # chosen side, the outcome depends on the player's draw choice.
+    captured = row.captured(bird, side)
+    return captured if captured else 'draw'
 
+@profiling.timed()
 def available_lays(hand, board):
     '''Lists all possible lays by a player with a given hand on a given board,
     and computes their outcomes.
 
     Args:
         hand (UnorderedCards, list or dict): A hand of cards.
-        board (dict of lists of strings): The rows of the board.
+        board (dict of Rows or lists of strings): The rows of the board.
 
     Returns:
-        dict: A nested dictionary with (bird, row, side) as keys and UnorderedCardss as
-            values.
+        dict: A nested dictionary with (bird, row, side) as keys and lists of
+            captured cards or 'draw' as values.
     '''
     hand = UnorderedCards(hand)
+    rows = [(n_row, row if isinstance(row, Row) else Row(row))
+            for n_row, row in board.items()]
     out = {}
-    for bird in set(hand.l):
-        for n_row, row in board.items():
+    for bird in hand.keys():
+        for n_row, row in rows:
             for side in ['left', 'right']:
-                out[(bird, n_row, side)] = compute_lay(bird, row, side)
+                out[(bird, n_row, side)] = row.captured(bird, side) or 'draw'
 
     return out
 
+@lru_cache(maxsize=65536)
+def _flocks(key):
+    '''Computes the flock levels and flock options of a hand from its bird
+    counts capped at the big flock size (more birds than that give the same
+    flocks), so that hands sharing a key share one cache entry.
+    '''
+    levels = []
+    for bird, count, small, big in zip(BIRDS, key, SMALL, BIG):
+        if count >= big:
+            levels.append((bird, 2))
+        elif count >= small:
+            levels.append((bird, 1))
+        elif count:
+            levels.append((bird, 0))
+    options = tuple(sorted(
+        '{}_{}'.format('big' if flock == 2 else 'small', bird)
+        for bird, flock in levels if flock))
+    return tuple(levels), options
+
+def _flocks_of(counts):
+    return _flocks(tuple(c if c < big else big for c, big in zip(counts, BIG)))
+
+def flock_cache_info():
+    '''Hit and miss statistics of the cache used by available_flocks and
+    flock_options, as returned by functools.lru_cache.
+    '''
+    return _flocks.cache_info()
+
+@profiling.timed()
 def available_flocks(hand):
     '''Given a hand of cards, returns a dict of flock possibilities.
     Args:
@@ -59,16 +92,17 @@ def available_flocks(hand):
         dict: A dictionary with card types as keys and either 0 (no flock), 1
              (small flock) or 2 (big flock) as values.
     '''
-    hand = UnorderedCards(hand)
-    out = {}
-    for bird, count in hand.items():
-        if count >= card_data[bird]['big']:
-            out[bird] = 2
-        elif count >= card_data[bird]['small']:
-            out[bird] = 1
-        else:
-            out[bird] = 0
-    return out
+    if not isinstance(hand, UnorderedCards):
+        hand = UnorderedCards(hand)
+    return dict(_flocks_of(hand.counts)[0])
+
+def flock_options(hand):
+    '''Given a hand of cards, returns the sorted tuple of its flock options,
+    like flocks_to_list(available_flocks(hand)).
+    '''
+    if not isinstance(hand, UnorderedCards):
+        hand = UnorderedCards(hand)
+    return _flocks_of(hand.counts)[1]
 
 def flocks_to_list(flock_dict):
     '''Turns a flock dict (with card types as keys and either 0 (no flock), 1
@@ -89,7 +123,48 @@ def flocks_to_list(flock_dict):
             out.append('{}_{}'.format('small', bird))
     return sorted(out)
 
-def available_moves(game, counts='deck'):
+def _choose(n, k):
+    # Binomial coefficient, extended to non-integer n as
+    # n (n - 1) ... (n - k + 1) / k! for weighted counts.
+    if n == int(n):
+        return comb(int(n), k)
+    out = 1.
+    for i in range(k):
+        out *= (n - i) / (i + 1)
+    return out
+
+@lru_cache(maxsize=1024)
+def draw_distribution(counts, n=2):
+    '''Computes the probability of every unordered draw of n cards from a stack
+    of cards (a multivariate hypergeometric distribution).
+
+    Args:
+        counts (tuple): The number of cards of each bird in the stack, in
+            BIRDS order. Non-integer weights are allowed, and give each draw
+            the probability of drawing its cards one after the other, the
+            weight of a bird going down by one with each of its cards drawn.
+        n (int): The number of cards drawn.
+
+    Returns:
+        tuple: (draw, probability) pairs for every draw with a non-zero
+            probability, draw being a tuple of bird counts in BIRDS order.
+    '''
+    n_draws = _choose(sum(counts), n)
+    out = []
+    for birds in it.combinations_with_replacement(range(N_BIRDS), n):
+        draw = [0] * N_BIRDS
+        for bird in birds:
+            draw[bird] += 1
+        n_ways = 1
+        for count, k in zip(counts, draw):
+            if k:
+                n_ways *= _choose(count, k)
+        if n_ways:
+            out.append((tuple(draw), n_ways / n_draws))
+    return tuple(out)
+
+@profiling.timed()
+def available_moves(game, counts='deck', draw_size=2):
     '''Lists all legal moves the current player can make at the start of his
     turn.
 
@@ -100,47 +175,170 @@ def available_moves(game, counts='deck'):
             If 'deck', uses the base probabilities in the deck.
             If 'invisible', uses the card proportion in cards invisible to the player.
             If dict, implements custom class probabilities.
+        draw_size (int): The number of cards drawn by a lay which captures
+            nothing.
+
+    Returns:
+        dict: Lay options as keys. Values are tuples of flock options for lays
+            which capture birds, and dicts mapping tuples of flock options to
+            their probability for lays which draw cards.
     '''
     if counts == 'deck':
-        counts = {}
-        for bird, info in card_data.items():
-            counts[bird] = info['count']
+        counts = COUNT
     elif counts == 'invisible':
-        counts = game.invisible(game.current_player).to_dict()
-
-    counts['total'] = sum(counts.values())
+        counts = game.invisible(game.current_player).counts
+    else:
+        counts = UnorderedCards(counts).counts
 
-    draw_probas = {}
-    for draw in it.product(card_data, card_data):
-        same = draw[0] == draw[1]
-        draw_probas[draw] = (
-              counts[draw[0]]
-            / counts['total']
-            * (counts[draw[1]] - (1 if same else 0))
-            / (counts['total'] - 1)
-        )
+    draws = draw_distribution(counts, draw_size)
 
+    # Lays of the same bird leave the same hand before drawing, so their draw
+    # outcomes are computed once.
+    proba_maps = {}
     out = {}
     for lay_option, cards in available_lays(game.current_hand, game.board).items():
         hand = UnorderedCards(game.current_hand)
         hand.draw_all(lay_option[0])
         if cards == 'draw':
-            proba_map = {}
-            for draw in it.product(card_data, card_data):
-                flocks = tuple(flocks_to_list(available_flocks(hand + list(draw))))
-
-                if flocks in proba_map:
-                    proba_map[flocks] += draw_probas[draw]
-                else:
-                    proba_map[flocks] = draw_probas[draw]
-            # proba_map = {k: v/64 for k, v in proba_map.items()}
-            out[lay_option] = proba_map
+            key = hand.counts
+            if key not in proba_maps:
+                proba_map = {}
+                for draw, proba in draws:
+                    flocks = _flocks_of([h + d for h, d in zip(key, draw)])[1]
+                    proba_map[flocks] = proba_map.get(flocks, 0) + proba
+                proba_maps[key] = proba_map
+            out[lay_option] = dict(proba_maps[key])
 
         else:
-            out[lay_option] = tuple(flocks_to_list(available_flocks(hand + cards)))
+            out[lay_option] = flock_options(hand + cards)
 
     return out
 
+BatchMoves = namedtuple('BatchMoves', [
+    'legal', 'captured', 'levels', 'draws', 'draw_probs', 'draw_levels', 'flock_probs'])
+BatchMoves.__doc__ = '''The moves of a batch of B positions, as computed by
+available_moves_batch. Lays are indexed by (bird, row, side) like in
+actions.py, and the flock level of a bird is 0 (no flock), 1 (small) or 2 (big).
+
+Attributes:
+    legal (ndarray): (B, N_BIRDS, n_rows, 2) whether each lay is legal.
+    captured (ndarray): (B, N_BIRDS, n_rows, 2, N_BIRDS) counts of the birds
+        each lay captures, all 0 for lays which draw.
+    levels (ndarray): (B, N_BIRDS, n_rows, 2, N_BIRDS) flock level of each
+        bird after each lay, before any draw.
+    draws (ndarray): (n_draws, N_BIRDS) every unordered draw, as counts.
+    draw_probs (ndarray): (B, n_draws) probability of each draw.
+    draw_levels (ndarray): (B, N_BIRDS, n_draws, N_BIRDS) flock level of each
+        bird after laying a bird (second axis) and making each draw.
+    flock_probs (ndarray): (B, N_BIRDS, N_BIRDS, 3) probability of each flock
+        level of each bird after laying a bird and drawing.
+'''
+
+@lru_cache(maxsize=16)
+def _draws(n):
+    draws = np.zeros((comb(N_BIRDS + n - 1, n), N_BIRDS), dtype=np.int64)
+    for i, birds in enumerate(it.combinations_with_replacement(range(N_BIRDS), n)):
+        for bird in birds:
+            draws[i, bird] += 1
+    draws.setflags(write=False)
+    return draws
+
+def _comb(n, k):
+    # Elementwise binomial coefficients, for k up to the draw size.
+    out = np.ones(np.broadcast(n, k).shape)
+    for i in range(int(np.max(k, initial=0))):
+        out = np.where(k > i, out * (n - i) / (i + 1), out)
+    return np.where(n >= k, out, 0.)
+
+def _levels(hands):
+    return (hands >= SMALL_ARRAY).astype(np.int8) + (hands >= BIG_ARRAY)
+
+def stack_states(games, counts='invisible'):
+    '''Stack the positions of the current players of games in the arrays
+    taken by available_moves_batch. Games must have the same number of rows.
+
+    Args:
+        games (list of Game): The games.
+        counts (str): 'invisible' for the cards each current player cannot
+            see, or 'deck' for the base counts of the deck.
+
+    Returns:
+        ndarray: (B, N_BIRDS) hands.
+        ndarray: (B, n_rows, width) rows, padded with EMPTY like in BatchGame.
+        ndarray: (B, n_rows) row lengths.
+        ndarray: (B, N_BIRDS) counts of the cards draws come from.
+    '''
+    n_rows = games[0].n_rows
+    row_len = np.array([[len(game.board[n_row]) for n_row in range(n_rows)]
+                        for game in games], dtype=np.int64).reshape(len(games), n_rows)
+    rows = np.full(row_len.shape + (row_len.max(initial=1),), EMPTY, dtype=np.int8)
+    for i, game in enumerate(games):
+        for n_row in range(n_rows):
+            rows[i, n_row, :row_len[i, n_row]] = [BIRD_INDEX[b] for b in game.board[n_row]]
+    hands = np.array([game.current_hand.counts for game in games], dtype=np.int64)
+    if counts == 'invisible':
+        counts = np.array([game.unseen_counts(game.current_player) for game in games])
+    else:
+        counts = np.broadcast_to(COUNT_ARRAY, hands.shape)
+    return hands, rows, row_len, counts
+
+@profiling.timed()
+def available_moves_batch(hands, rows, row_len, counts=None, draw_size=2):
+    '''Compute the moves of many positions at once, like available_moves but
+    with array operations over the whole batch.
+
+    Args:
+        hands (ndarray): (B, N_BIRDS) hands of the players to move.
+        rows (ndarray): (B, n_rows, width) birds of each row, from left to
+            right, padded with EMPTY (see BatchGame.rows).
+        row_len (ndarray): (B, n_rows) number of birds in each row.
+        counts (ndarray): (B, N_BIRDS) counts of the cards draws come from,
+            e.g. from stack_states. Defaults to the base counts of the deck.
+        draw_size (int): The number of cards drawn by a lay which captures
+            nothing.
+
+    Returns:
+        BatchMoves: The lay outcomes and flock levels of every position.
+    '''
+    hands = np.asarray(hands, dtype=np.int64)
+    rows = np.asarray(rows)
+    n_positions, n_rows, width = rows.shape
+    if counts is None:
+        counts = np.broadcast_to(COUNT_ARRAY, hands.shape)
+    counts = np.asarray(counts, dtype=np.int64)
+    birds = np.arange(N_BIRDS)
+    ix = np.arange(width)
+    present = ix < np.asarray(row_len)[..., None]
+
+    # (B, n_rows, bird laid, position) matches, and the position of the
+    # leftmost and rightmost match.
+    match = (rows[:, :, None, :] == birds[:, None]) & present[:, :, None, :]
+    found = match.any(-1)
+    first = match.argmax(-1)
+    last = width - 1 - match[..., ::-1].argmax(-1)
+    left = found[..., None] & (ix < first[..., None])
+    right = found[..., None] & (ix > last[..., None]) & present[:, :, None, :]
+    taken = np.stack([left, right], -2)
+
+    # Count the captured birds: (B, n_rows, bird laid, side, bird captured).
+    onehot = (rows[..., None] == birds) & present[..., None]
+    captured = np.einsum('xrbsw,xrwc->xrbsc', taken.astype(np.int64), onehot.astype(np.int64))
+    captured = captured.transpose(0, 2, 1, 3, 4)
+
+    legal = np.broadcast_to((hands > 0)[:, :, None, None], captured.shape[:4])
+    after_lay = np.where(np.eye(N_BIRDS, dtype=bool), 0, hands[:, None, :])
+    levels = _levels(after_lay[:, :, None, None, :] + captured)
+
+    draws = _draws(draw_size)
+    total = counts.sum(1)
+    draw_probs = (_comb(counts[:, None, :], draws).prod(-1)
+                  / np.maximum(_comb(total, draw_size), 1)[:, None])
+    draw_levels = _levels(after_lay[:, :, None, :] + draws)
+    flock_probs = np.einsum('xd,xbdcl->xbcl', draw_probs,
+                            (draw_levels[..., None] == np.arange(3)).astype(np.float64))
+
+    return BatchMoves(legal, captured, levels, draws, draw_probs, draw_levels, flock_probs)
+
 def print_available_moves(am):
     d = {}
     for lay_option, outcome in am.items():
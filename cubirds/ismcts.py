@@ -0,0 +1,264 @@
+from collections import namedtuple
+import math
+from timeit import default_timer as dt
+import numpy as np
+
+from .cards import UnorderedCards
+from .game import Game
+from .game_analysis import available_lays, available_flocks
+from ..random_moves import random_choice, random_turn
+
+SearchStats = namedtuple('SearchStats', ['iterations', 'elapsed_ms', 'iterations_per_sec'])
+SearchStats.__doc__ = '''Statistics of one decision.
+
+Attributes:
+    iterations (int): Number of search iterations, summed over workers.
+    elapsed_ms (float): Wall-clock time of the decision, including
+                        inter-process communication.
+    iterations_per_sec (float): iterations / elapsed time.
+'''
+
+
+def legal_moves(game):
+    '''Lists the moves the current player can make in the current phase, in
+    the format of Game.apply.
+    '''
+    if game.current_phase == 'lay':
+        return list(available_lays(game.current_hand, game.board))
+    flocks = [bird for bird, flock in available_flocks(game.current_hand).items() if flock]
+    return flocks + [None]
+
+def determinize(game, player, rng=None):
+    '''Return a copy of game where everything hidden from player (the other
+    players' hands and the deck) has been redealt at random, keeping the
+    number of cards in each hand.
+
+    The copy draws its cards from rng (defaults to the generator of game), so
+    that playing it out does not consume the game's own random streams.
+    '''
+    rng = game.rng if rng is None else rng
+    game = game.clone()
+    game.rng = game.deck_rng = rng
+    hidden = UnorderedCards(game.deck)
+    for p, hand in game.hands.items():
+        if p != player:
+            hidden += hand
+    for p, hand in game.hands.items():
+        if p != player:
+            game.hands[p] = hidden.draw(len(hand), rng)
+    game.deck = hidden
+    return game
+
+def _play(game, move):
+    if game.current_phase == 'lay':
+        game.lay(*move)
+    else:
+        game.flock(move)
+
+
+class Node:
+    '''A node of the search tree, reached by playing move.
+
+    Attributes:
+        move: The move leading to this node.
+        player (int): The player who played move.
+        parent (Node): The node the move was played from.
+        children (dict): Child nodes with their moves as keys.
+        visits (int): Number of iterations which went through this node.
+        wins (int): Number of those iterations won by player.
+        available (int): Number of iterations in which move was legal.
+    '''
+    __slots__ = ('move', 'player', 'parent', 'children', 'visits', 'wins', 'available')
+
+    def __init__(self, move=None, player=None, parent=None):
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children = {}
+        self.visits = 0
+        self.wins = 0
+        self.available = 1
+
+    def ucb(self, c):
+        return self.wins / self.visits + c * math.sqrt(math.log(self.available) / self.visits)
+
+
+def search(game, iterations=None, time_ms=None, c=0.7, rng=None):
+    '''Run a single-observer Information Set Monte Carlo Tree Search from the
+    point of view of the current player.
+
+    Each iteration redeals the cards hidden from the player, walks down the
+    tree among the moves legal in that deal (expanding one new move), then
+    finishes the game with random moves.
+
+    Args:
+        game (Game): The game to search. It is not modified.
+        iterations (int): Maximum number of iterations.
+        time_ms (float): Maximum search time in milliseconds.
+        c (float): Exploration constant of the UCB formula.
+        rng (np.random.Generator): Source of randomness of the search.
+            Defaults to a freshly seeded generator.
+
+    Returns:
+        dict: Root moves as keys and (visits, wins) as values.
+        int: The number of iterations run.
+    '''
+    assert iterations is not None or time_ms is not None, 'The search needs a budget.'
+    rng = np.random.default_rng(rng)
+    player = game.current_player
+    root = Node()
+    deadline = None if time_ms is None else dt() + time_ms / 1000
+
+    n_iterations = 0
+    while ((iterations is None or n_iterations < iterations)
+           and (deadline is None or dt() < deadline)):
+        n_iterations += 1
+        state = determinize(game, player, rng)
+        state.verbose = False
+        node = root
+
+        # Selection and expansion.
+        while not state.end:
+            moves = legal_moves(state)
+            untried = [move for move in moves if move not in node.children]
+            for move in moves:
+                if move in node.children:
+                    node.children[move].available += 1
+            if untried:
+                move = random_choice(untried, rng)
+                node.children[move] = Node(move, state.current_player, node)
+                node = node.children[move]
+                _play(state, move)
+                break
+            node = max((node.children[move] for move in moves), key=lambda n: n.ucb(c))
+            _play(state, node.move)
+
+        # Simulation. An iteration running past the deadline is abandoned so
+        # that decisions stay within their time budget.
+        if not state.end and state.current_phase == 'flock':
+            _play(state, random_choice(legal_moves(state), rng))
+        while not state.end and (deadline is None or dt() < deadline):
+            random_turn(state)
+        if not state.end:
+            n_iterations -= 1
+            break
+
+        # Backpropagation.
+        while node is not None:
+            node.visits += 1
+            if state.winner is not None and state.winner == node.player:
+                node.wins += 1
+            node = node.parent
+
+    results = {move: (child.visits, child.wins) for move, child in root.children.items()}
+    return results, n_iterations
+
+def _search_worker(args):
+    # Games are sent to the workers in their compact binary encoding.
+    buf, iterations, time_ms, c, seed = args
+    rng = np.random.default_rng(seed)
+    return search(Game.decode(buf, rng=rng), iterations, time_ms, c, rng)
+
+
+class ISMCTSAgent:
+    '''An agent choosing its moves with Information Set Monte Carlo Tree Search.
+
+    With n_workers > 1, the search is root-parallel: each worker process
+    searches independently from the same position and the visit counts of
+    the root moves are added up.
+
+    Example:
+        agent = ISMCTSAgent(time_ms=100, n_workers=4)
+        while not game.end:
+            agent(game)
+        print(agent.summary())
+        agent.close()
+
+    Attributes:
+        stats (list of SearchStats): Statistics of every decision so far.
+    '''
+    def __init__(self, iterations=None, time_ms=100, c=0.7, n_workers=1, seed=None):
+        '''Args:
+            iterations (int): Maximum number of iterations per move, split
+                between workers.
+            time_ms (float): Maximum time per move in milliseconds.
+            c (float): Exploration constant of the UCB formula.
+            n_workers (int): Number of processes searching in parallel.
+            seed (int): Seed of the search. Each worker gets an independent
+                stream spawned from it.
+        '''
+        self.iterations = iterations
+        self.time_ms = time_ms
+        self.c = c
+        self.n_workers = n_workers
+        self.seeds = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seeds.spawn(1)[0])
+        self.stats = []
+        self._pool = None
+
+    def choose_move(self, game):
+        '''Return the move to play in the current phase of game.'''
+        start = dt()
+        moves = legal_moves(game)
+        if len(moves) == 1:
+            self.stats.append(SearchStats(0, (dt() - start) * 1000, 0))
+            return moves[0]
+
+        iterations = self.iterations
+        if iterations is not None:
+            iterations = max(1, iterations // self.n_workers)
+        if self.n_workers == 1:
+            results = [search(game, iterations, self.time_ms, self.c, self.rng)]
+        else:
+            if self._pool is None:
+                import multiprocessing as mp
+                self._pool = mp.Pool(self.n_workers)
+            buf = game.encode()
+            jobs = [(buf, iterations, self.time_ms, self.c, seed)
+                    for seed in self.seeds.spawn(self.n_workers)]
+            results = self._pool.map(_search_worker, jobs)
+
+        visits = {}
+        n_iterations = 0
+        for root, n in results:
+            n_iterations += n
+            for move, (n_visits, _) in root.items():
+                visits[move] = visits.get(move, 0) + n_visits
+
+        elapsed = dt() - start
+        self.stats.append(SearchStats(n_iterations, elapsed * 1000, n_iterations / elapsed))
+        return max(moves, key=lambda move: visits.get(move, 0))
+
+    def __call__(self, game):
+        '''Play a full turn (lay, then flock) for the current player.'''
+        assert game.current_phase == 'lay'
+        game.lay(*self.choose_move(game), draw=True)
+        if not game.end:
+            game.flock(self.choose_move(game))
+
+    def summary(self):
+        '''Summarize decision statistics for tuning.
+
+        Returns:
+            dict: Number of decisions, mean iterations per decision, overall
+                iterations per second and mean / 95th percentile decision
+                latency in milliseconds.
+        '''
+        searched = [s for s in self.stats if s.iterations]
+        if not searched:
+            return {'decisions': 0}
+        latency = np.array([s.elapsed_ms for s in searched])
+        iterations = sum(s.iterations for s in searched)
+        return {
+            'decisions': len(searched),
+            'iterations': iterations / len(searched),
+            'iterations_per_sec': float(iterations / latency.sum() * 1000),
+            'latency_ms': float(latency.mean()),
+            'latency_p95_ms': float(np.percentile(latency, 95)),
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
@@ -0,0 +1,332 @@
+'''A lookahead planner over the current player's own next turns.
+
+The planner only follows the hand and the collection of the current player.
+The other players are ignored: every lay of the plan captures what it would
+capture on the current board, and every draw comes from the cards the player
+cannot see, with their current counts (see Game.unseen_counts). Under these
+assumptions a position is just a pair of count vectors, so the values of
+positions and of draws are computed once and shared by every branch reaching
+them.
+
+Plans are functions of the position, so a transposition.TranspositionTable
+keyed by Game.hash lets plans reuse the rankings of positions already
+planned, e.g. the opening positions replayed by every seating of a
+tournament round, or positions reached by several games or agents.
+'''
+from collections import namedtuple
+from functools import lru_cache
+from timeit import default_timer as dt
+import numpy as np
+
+from .catalog import BIG, BIRDS, BIRD_INDEX, N_BIRDS, SMALL
+from .game_analysis import draw_distribution
+from .ismcts import legal_moves
+
+PlanStats = namedtuple('PlanStats', ['depth', 'nodes', 'elapsed_ms'])
+PlanStats.__doc__ = '''Statistics of one plan.
+
+Attributes:
+    depth (int): Number of turns of the deepest search completed in time.
+    nodes (int): Number of positions and draws evaluated.
+    elapsed_ms (float): Wall-clock time of the plan.
+'''
+
+WIN = 1.
+
+# How close n birds in hand are to a small flock, for each bird and each n up
+# to the big flock size.
+_POTENTIAL = [[min(n / small, 1.) / N_BIRDS for n in range(big + 1)]
+              for small, big in zip(SMALL, BIG)]
+
+
+@lru_cache(maxsize=65536)
+def progress(collection):
+    '''Value of a collection between 0 and WIN: the fraction of the way to
+    the closest win condition (seven species, or three birds of two species).
+
+    Args:
+        collection (tuple): The count of each bird, in BIRDS order.
+    '''
+    n_species = 0
+    triples = [0, 0]
+    for count in collection:
+        if count:
+            n_species += 1
+            count = min(count, 3)
+            if count > triples[0]:
+                triples[0] = count
+                triples.sort()
+    if n_species >= 7 or triples[0] == 3:
+        return WIN
+    return max(n_species / 7, (triples[0] + triples[1]) / 6)
+
+def _is_win(collection):
+    return progress(collection) == WIN
+
+
+class _Timeout(Exception):
+    pass
+
+
+class _Search:
+    '''Memoized expectimax over (hand, collection) count vectors, as
+    described in the module docstring.
+    '''
+    def __init__(self, game, gamma, hand_weight, deadline):
+        self.gamma = gamma
+        self.hand_weight = hand_weight
+        self.deadline = deadline
+        self.nodes = 0
+        self.values = {}
+        self.chances = {}
+        self.flocks = {}
+        self.draws = draw_distribution(game.unseen_counts(game.current_player), 2)
+
+        # Distinct capture outcomes of each bird on the current board, and
+        # whether some lay of that bird captures nothing.
+        self.captures = [set() for _ in range(N_BIRDS)]
+        self.can_draw = [False] * N_BIRDS
+        for row in game.board.values():
+            for i, bird in enumerate(BIRDS):
+                for side in ('left', 'right'):
+                    captured = row.captured(bird, side)
+                    if captured:
+                        counts = [0] * N_BIRDS
+                        for b in captured:
+                            counts[BIRD_INDEX[b]] += 1
+                        self.captures[i].add(tuple(counts))
+                    else:
+                        self.can_draw[i] = True
+
+    def evaluate(self, hand, collection):
+        '''Progress of the collection, plus how close the hand is to flocks.'''
+        potential = 0.
+        for table, h in zip(_POTENTIAL, hand):
+            potential += table[h]
+        return progress(collection) + self.hand_weight * potential
+
+    def lay_value(self, hand, collection, bird, captured, depth):
+        '''Expected value of laying every bird of index bird and capturing
+        captured (a count vector), or drawing if captured is None.
+        '''
+        hand = [h if h < big else big for h, big in zip(hand, BIG)]
+        hand[bird] = 0
+        if captured is not None:
+            return self.flock_value([h + c for h, c in zip(hand, captured)], collection, depth)
+
+        key = (tuple(hand), collection, depth)
+        value = self.chances.get(key)
+        if value is None:
+            self.nodes += 1
+            if not self.draws:
+                # Nothing left to draw: the game ends in a draw.
+                value = 0.
+            else:
+                value = sum(p * self.flock_value([h + d for h, d in zip(hand, draw)],
+                                                 collection, depth)
+                            for draw, p in self.draws)
+            self.chances[key] = value
+        return value
+
+    def flock_options(self, hand, collection):
+        '''Yield (bird, hand, collection) for passing (bird None) and for
+        each flock the hand allows.
+        '''
+        yield None, hand, collection
+        for i, (count, small, big) in enumerate(zip(hand, SMALL, BIG)):
+            if count >= small:
+                new_hand = list(hand)
+                new_hand[i] = 0
+                new_collection = list(collection)
+                new_collection[i] += 2 if count >= big else 1
+                yield BIRDS[i], tuple(new_hand), tuple(new_collection)
+
+    def after_flock(self, hand, collection, depth):
+        '''Value of the position at the end of a turn, depth turns before
+        the end of the plan.
+        '''
+        if _is_win(collection):
+            return WIN
+        return self.gamma * self.value(hand, collection, depth)
+
+    def flock_value(self, hand, collection, depth):
+        # Birds beyond the big flock size make no difference in the model.
+        hand = tuple([h if h < big else big for h, big in zip(hand, BIG)])
+        key = (hand, collection, depth)
+        value = self.flocks.get(key)
+        if value is None:
+            value = max(self.after_flock(h, c, depth - 1)
+                        for _, h, c in self.flock_options(hand, collection))
+            self.flocks[key] = value
+        return value
+
+    def value(self, hand, collection, depth):
+        '''Value of the position at the start of a turn with depth turns
+        left to plan.
+        '''
+        if depth == 0 or not any(hand):
+            return self.evaluate(hand, collection)
+        key = (hand, collection, depth)
+        value = self.values.get(key)
+        if value is None:
+            self.nodes += 1
+            if self.deadline is not None and dt() > self.deadline:
+                raise _Timeout
+            value = max(self.bird_value(hand, collection, i, depth)
+                        for i, count in enumerate(hand) if count)
+            self.values[key] = value
+        return value
+
+    def bird_value(self, hand, collection, bird, depth):
+        '''Value of the best lay of the bird of index bird.'''
+        values = [self.lay_value(hand, collection, bird, captured, depth)
+                  for captured in self.captures[bird]]
+        if self.can_draw[bird]:
+            values.append(self.lay_value(hand, collection, bird, None, depth))
+        return max(values)
+
+    def rank(self, game, depth):
+        '''Value of each legal move of the current phase of game.'''
+        hand = tuple([h if h < big else big for h, big in zip(game.current_hand.counts, BIG)])
+        collection = game.current_collection.counts
+        out = []
+        if game.current_phase == 'lay':
+            for move in legal_moves(game):
+                bird, n_row, side = move
+                captured = game.board[n_row].captured(bird, side)
+                if captured:
+                    counts = [0] * N_BIRDS
+                    for b in captured:
+                        counts[BIRD_INDEX[b]] += 1
+                    captured = tuple(counts)
+                else:
+                    captured = None
+                out.append((move, self.lay_value(hand, collection, BIRD_INDEX[bird],
+                                                 captured, depth)))
+        else:
+            # The lay of this turn is done: plan the next depth - 1 turns.
+            for bird, h, c in self.flock_options(hand, collection):
+                out.append((bird, self.after_flock(h, c, depth - 1)))
+        return out
+
+
+def plan(game, depth=3, time_ms=None, gamma=0.9, hand_weight=0.1, table=None):
+    '''Rank the legal moves of the current phase of game by the expected value
+    of the current player's next turns (see the module docstring for the
+    model).
+
+    The search deepens one turn at a time, and the ranking of the deepest
+    search which finished within the time budget is returned. Values are
+    between 0 and WIN, which a collection meeting a win condition is worth.
+
+    Args:
+        game (Game): The game to plan for. It is not modified.
+        depth (int): Maximum number of turns to plan, including the current
+            one.
+        time_ms (float): Maximum planning time in milliseconds. The one-turn
+            search always runs to completion.
+        gamma (float): Discount of each turn, so that faster wins rank first.
+        hand_weight (float): Weight of the cards in hand in the value of the
+            positions at the end of the plan.
+        table (TranspositionTable): Rankings of the positions planned so far,
+            to share only between plans with the same gamma and hand_weight.
+            A ranking at least depth turns deep is returned without
+            searching, and new rankings are stored with their depth as
+            weight.
+
+    Returns:
+        list: (move, value) pairs, best first. Moves are in the format of
+            Game.apply.
+        PlanStats: Statistics of the plan.
+
+    Raises:
+        ValueError: If depth is less than 1.
+    '''
+    if depth < 1:
+        raise ValueError('The plan needs a depth of at least 1, not {}.'.format(depth))
+    start = dt()
+    if table is not None:
+        key = game.hash
+        entry = table.get(key)
+        if entry is not None and entry[0] >= depth:
+            return list(entry[1]), PlanStats(entry[0], 0, (dt() - start) * 1000)
+    deadline = None if time_ms is None else start + time_ms / 1000
+    search = _Search(game, gamma, hand_weight, None)
+    ranking = None
+    completed = 0
+    for d in range(1, depth + 1):
+        try:
+            ranking = search.rank(game, d)
+        except _Timeout:
+            break
+        completed = d
+        search.deadline = deadline
+        if deadline is not None and dt() > deadline:
+            break
+
+    # Stable sort: ties keep the order of legal_moves for lays, and passing
+    # comes first among flocks (see flock_options).
+    ranking.sort(key=lambda item: -item[1])
+    if table is not None:
+        table.put(key, (completed, tuple(ranking)), weight=completed)
+    return ranking, PlanStats(completed, search.nodes, (dt() - start) * 1000)
+
+
+class PlannerAgent:
+    '''An agent playing the best move found by plan.
+
+    Example:
+        agent = PlannerAgent(depth=3, time_ms=20)
+        while not game.end:
+            agent(game)
+        print(agent.summary())
+
+    Attributes:
+        stats (list of PlanStats): Statistics of every decision so far.
+        table (TranspositionTable): Rankings shared by the plans of the agent
+            (see plan), or None.
+    '''
+    def __init__(self, depth=3, time_ms=50, gamma=0.9, hand_weight=0.1, table=None):
+        '''Args:
+            depth, time_ms, gamma, hand_weight: As in plan.
+            table (TranspositionTable): As in plan. Agents with the same
+                gamma and hand_weight can share one.
+        '''
+        self.depth = depth
+        self.time_ms = time_ms
+        self.gamma = gamma
+        self.hand_weight = hand_weight
+        self.table = table
+        self.stats = []
+
+    def choose_move(self, game):
+        '''Return the move to play in the current phase of game.'''
+        ranking, stats = plan(game, self.depth, self.time_ms, self.gamma, self.hand_weight,
+                              self.table)
+        self.stats.append(stats)
+        return ranking[0][0]
+
+    def __call__(self, game):
+        '''Play a full turn (lay, then flock) for the current player.'''
+        assert game.current_phase == 'lay'
+        game.lay(*self.choose_move(game), draw=True)
+        if not game.end:
+            game.flock(self.choose_move(game))
+
+    def summary(self):
+        '''Summarize decision statistics for tuning.
+
+        Returns:
+            dict: Number of decisions, mean depth and nodes per decision and
+                mean / 95th percentile decision latency in milliseconds.
+        '''
+        if not self.stats:
+            return {'decisions': 0}
+        latency = np.array([s.elapsed_ms for s in self.stats])
+        return {
+            'decisions': len(self.stats),
+            'depth': float(np.mean([s.depth for s in self.stats])),
+            'nodes': float(np.mean([s.nodes for s in self.stats])),
+            'latency_ms': float(latency.mean()),
+            'latency_p95_ms': float(np.percentile(latency, 95)),
+        }
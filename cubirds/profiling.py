@@ -0,0 +1,160 @@
+'''Counters and timers for the hot paths of the game, off by default.
+
+Functions decorated with timed count their calls and their inclusive time,
+and count adds to named counters, but only between enable() and disable().
+Call sites guard count with `if profiling.enabled:`. Timers cost a wrapper
+call even when disabled, so timed leaves functions undecorated unless the
+CUBIRDS_PROFILE environment variable is set when they are defined, i.e.
+before cubirds is imported. Counters work either way.
+
+Each process has its own Stats; Stats from pool workers can be added up.
+
+Example:
+    # CUBIRDS_PROFILE=1 python script.py
+    from cubirds import profiling
+    profiling.enable()
+    playout(Game(3, verbose=False))
+    print(profiling.disable().report())
+'''
+from collections import Counter
+from functools import wraps
+import os
+from timeit import default_timer as dt
+
+enabled = False
+# Whether timed functions are decorated at all.
+TIMERS = bool(os.environ.get('CUBIRDS_PROFILE'))
+
+
+class Stats:
+    '''Counters and timers of one process, or several once merged.
+
+    Attributes:
+        calls (Counter): Number of calls of each timed function.
+        times (Counter): Total inclusive time in seconds of each timed function.
+        counts (Counter): Named counters.
+        elapsed (float): Seconds spent with profiling enabled.
+    '''
+    def __init__(self):
+        self.calls = Counter()
+        self.times = Counter()
+        self.counts = Counter()
+        self.elapsed = 0.
+
+    def merge(self, other):
+        '''Add the statistics of other to self and return self.'''
+        self.calls.update(other.calls)
+        self.times.update(other.times)
+        self.counts.update(other.counts)
+        self.elapsed += other.elapsed
+        return self
+
+    def __add__(self, other):
+        return Stats().merge(self).merge(other)
+
+    def summary(self, wall_time=None):
+        '''Summarize the statistics.
+
+        Args:
+            wall_time (float): Duration of the run in seconds, used for rates.
+                Defaults to self.elapsed, which for merged Stats is the sum
+                of every worker's time.
+
+        Returns:
+            dict: Rates of finished games and moves per second, counters, and
+                for each timed function its calls, total time and mean time
+                per call in microseconds.
+        '''
+        wall_time = self.elapsed if wall_time is None else wall_time
+        return {
+            'games_per_sec': self.counts['games'] / wall_time if wall_time else 0.,
+            'moves_per_sec': self.counts['moves'] / wall_time if wall_time else 0.,
+            'counts': dict(self.counts),
+            'functions': {
+                name: {
+                    'calls': self.calls[name],
+                    'time': self.times[name],
+                    'us_per_call': self.times[name] / self.calls[name] * 1e6,
+                }
+                for name in self.calls
+            },
+        }
+
+    def report(self, wall_time=None):
+        '''Format summary as a table of timed functions, slowest first.'''
+        summary = self.summary(wall_time)
+        out = [
+            'games/s: {:.1f}  moves/s: {:.1f}'.format(
+                summary['games_per_sec'], summary['moves_per_sec']),
+            '',
+            '{:<32}{:>12}{:>12}{:>12}'.format('function', 'calls', 'time (s)', 'us/call'),
+        ]
+        functions = sorted(summary['functions'].items(), key=lambda item: -item[1]['time'])
+        for name, f in functions:
+            out.append('{:<32}{:>12}{:>12.3f}{:>12.2f}'.format(
+                name, f['calls'], f['time'], f['us_per_call']))
+        out.append('')
+        for name, count in sorted(summary['counts'].items()):
+            out.append('{:<32}{:>12}'.format(name, count))
+        return '\n'.join(out)
+
+
+stats = Stats()
+_start = None
+
+
+def enable():
+    '''Start collecting statistics in this process.'''
+    global enabled, _start
+    if not enabled:
+        enabled = True
+        _start = dt()
+
+def disable():
+    '''Stop collecting statistics and return them.'''
+    global enabled
+    if enabled:
+        enabled = False
+        stats.elapsed += dt() - _start
+    return stats
+
+def reset():
+    '''Clear the statistics of this process and return the old ones.'''
+    global stats, _start
+    old = stats
+    if enabled:
+        old.elapsed += dt() - _start
+        _start = dt()
+    stats = Stats()
+    return old
+
+def count(name, n=1):
+    '''Add n to a counter. Call sites should check enabled first.'''
+    stats.counts[name] += n
+
+def timed(name=None):
+    '''Decorator counting the calls and the time of a function while
+    profiling is enabled. It returns the function itself unless TIMERS is set.
+
+    Args:
+        name (str): Name of the timer. Defaults to the function's qualified
+            name.
+    '''
+    def decorator(func):
+        if not TIMERS:
+            return func
+        key = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = dt()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                # Read the global here: reset replaces it.
+                stats.times[key] += dt() - start
+                stats.calls[key] += 1
+        return wrapper
+    return decorator
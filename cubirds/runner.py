@@ -0,0 +1,259 @@
+import json
+import os
+from timeit import default_timer as dt
+import numpy as np
+
+from . import profiling
+from .game import Game
+from .stats import PlayoutStats
+from ..random_moves import playout
+
+# Fixed-size binary record of one played game:
+#   game: index of the game in the study,
+#   seed: seed of the game (see game_seed),
+#   n_players: number of players,
+#   winner: seat of the winner, or -1 if the game ended in a draw,
+#   n_moves: number of turns played.
+RECORD = np.dtype([
+    ('game', '<u8'),
+    ('seed', '<u4'),
+    ('n_players', 'u1'),
+    ('winner', 'i1'),
+    ('n_moves', '<u2'),
+])
+
+
+def game_seed(seed, game):
+    '''Seed of game number game of a study seeded with seed. Depends only on
+    the pair, so that games get independent random streams wherever they
+    are played and any game of a study can be replayed on its own.
+    '''
+    return int(np.random.SeedSequence([seed, game]).generate_state(1)[0])
+
+def play_game(n_players, n_rows, seed, on_event=None):
+    '''Play a game with random moves from a given seed. Deals, draws and
+    moves all come from one generator seeded with seed.
+
+    Returns:
+        Game: The finished game.
+        int: The number of turns played.
+    '''
+    game = Game(n_players, n_rows, verbose=False, rng=seed, on_event=on_event)
+    _, n_moves = playout(game)
+    return game, n_moves
+
+def _play_chunk(args):
+    '''Play games start to stop of a study and return their records, with
+    the profiling statistics of the chunk if profile is set and its
+    PlayoutStats if stats is set.
+    '''
+    n_chunk, n_players, n_rows, seed, start, stop, profile, stats = args
+    if profile:
+        # With n_workers=1 this is the caller's process: keep its statistics.
+        was_enabled = profiling.enabled
+        profiling.disable()
+        previous = profiling.reset()
+        profiling.enable()
+    stats = PlayoutStats() if stats else None
+    records = np.zeros(stop - start, dtype=RECORD)
+    for i, n_game in enumerate(range(start, stop)):
+        s = game_seed(seed, n_game)
+        game, n_moves = play_game(n_players, n_rows, s, on_event=stats)
+        records[i] = (n_game, s, n_players,
+                      -1 if game.winner is None else game.winner, n_moves)
+    profile_stats = None
+    if profile:
+        profiling.disable()
+        profile_stats = profiling.reset()
+        profiling.stats = previous
+        if was_enabled:
+            profiling.enable()
+    return n_chunk, records, profile_stats, stats
+
+
+class PlayoutRunner:
+    '''Plays a large number of random games in parallel and streams one
+    RECORD per game to a binary file.
+
+    Games are dispatched to the workers in chunks. Chunks are written as soon
+    as they come back, in completion order, and the list of finished chunks is
+    checkpointed to path + '.json' along with the size of the file at that
+    point. Running the same study again resumes it: the file is truncated to
+    its checkpointed size and only the missing chunks are played.
+
+    Example:
+        runner = PlayoutRunner('playouts.bin', 10_000_000, n_players=3, profile=True)
+        runner.run()
+        records = runner.load()
+        print(np.bincount(records['n_moves']))
+        print(runner.profile.report(runner.wall_time))
+    '''
+    def __init__(self, path, n_games, n_players=3, n_rows=4, seed=0,
+                 chunk_size=1000, n_workers=None, checkpoint_every=5., profile=False,
+                 stats=False):
+        '''Args:
+            path (str): Path of the binary file of records.
+            n_games (int): Number of games in the study.
+            n_players (int): Number of players in each game.
+            n_rows (int): Number of rows on the board.
+            seed (int): Seed of the study.
+            chunk_size (int): Number of games sent to a worker at once.
+            n_workers (int): Number of processes. Defaults to the number of
+                CPUs. With 1, games are played in the current process.
+            checkpoint_every (float): Minimum number of seconds between two
+                checkpoints. A checkpoint is always written at the end.
+            profile (bool): Collect profiling statistics in the workers and
+                merge them into self.profile (see profiling.py). Function
+                timers need CUBIRDS_PROFILE set before cubirds is imported.
+            stats (bool): Aggregate game statistics in the workers and merge
+                them into self.stats (a stats.PlayoutStats). They are saved
+                with each checkpoint, so they survive interruptions and load()
+                refreshes them while another process runs the study. A study
+                started without statistics cannot be resumed with them.
+        '''
+        self.path = path
+        self.checkpoint_path = path + '.json'
+        self.params = {
+            'n_games': n_games,
+            'n_players': n_players,
+            'n_rows': n_rows,
+            'seed': seed,
+            'chunk_size': chunk_size,
+        }
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.checkpoint_every = checkpoint_every
+        self.profile = profiling.Stats() if profile else None
+        self.stats = PlayoutStats() if stats else None
+        self.wall_time = 0.
+        self.done = set()
+        self.size = 0
+
+    @property
+    def n_chunks(self):
+        return -(-self.params['n_games'] // self.params['chunk_size'])
+
+    def _chunk_args(self, n_chunk):
+        p = self.params
+        start = n_chunk * p['chunk_size']
+        stop = min(start + p['chunk_size'], p['n_games'])
+        return (n_chunk, p['n_players'], p['n_rows'], p['seed'], start, stop,
+                self.profile is not None, self.stats is not None)
+
+    def _read_checkpoint(self):
+        '''Load the set of finished chunks, the matching file size and
+        statistics.
+        '''
+        self.done = set()
+        self.size = 0
+        if self.stats is not None:
+            self.stats = PlayoutStats()
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as file:
+                checkpoint = json.load(file)
+            if checkpoint['params'] != self.params:
+                raise ValueError('{} belongs to a different study: {}'.format(
+                    self.checkpoint_path, checkpoint['params']))
+            self.done = set(checkpoint['done'])
+            self.size = checkpoint['size']
+            if self.stats is not None:
+                if checkpoint.get('stats'):
+                    self.stats = PlayoutStats.from_dict(checkpoint['stats'])
+                elif self.done:
+                    # The finished chunks would be missing from the statistics.
+                    raise ValueError('{} was run without statistics.'.format(
+                        self.checkpoint_path))
+
+    def _resume(self):
+        '''Load the checkpoint and drop records written after it.'''
+        self._read_checkpoint()
+        with open(self.path, 'ab') as file:
+            file.truncate(self.size)
+
+    def _checkpoint(self):
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w') as file:
+            json.dump({
+                'params': self.params,
+                'done': sorted(self.done),
+                'size': self.size,
+                'stats': None if self.stats is None else self.stats.to_dict(),
+            }, file)
+        os.replace(tmp, self.checkpoint_path)
+
+    def run(self, progress=False):
+        '''Play the games which are not on disk yet.
+
+        Args:
+            progress (bool): Show a tqdm progress bar.
+
+        Returns:
+            int: The number of games played by this call.
+        '''
+        self._resume()
+        todo = [n for n in range(self.n_chunks) if n not in self.done]
+        jobs = (self._chunk_args(n) for n in todo)
+        n_played = 0
+
+        bar = None
+        if progress:
+            from tqdm import tqdm
+            bar = tqdm(total=self.params['n_games'],
+                       initial=self.size // RECORD.itemsize)
+
+        pool = None
+        if self.n_workers > 1 and len(todo) > 1:
+            import multiprocessing as mp
+            pool = mp.Pool(min(self.n_workers, len(todo)))
+            results = pool.imap_unordered(_play_chunk, jobs)
+        else:
+            results = map(_play_chunk, jobs)
+
+        start = dt()
+        try:
+            last_checkpoint = dt()
+            with open(self.path, 'ab') as file:
+                for n_chunk, records, profile_stats, stats in results:
+                    if profile_stats is not None:
+                        self.profile.merge(profile_stats)
+                    if stats is not None:
+                        self.stats.merge(stats)
+                    file.write(records.tobytes())
+                    self.done.add(n_chunk)
+                    self.size += records.nbytes
+                    n_played += len(records)
+                    if bar is not None:
+                        bar.update(len(records))
+                    if dt() - last_checkpoint >= self.checkpoint_every:
+                        file.flush()
+                        os.fsync(file.fileno())
+                        self._checkpoint()
+                        last_checkpoint = dt()
+                file.flush()
+                os.fsync(file.fileno())
+                self._checkpoint()
+        finally:
+            self.wall_time += dt() - start
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            if bar is not None:
+                bar.close()
+
+        return n_played
+
+    def load(self, mmap=False):
+        '''Read the records on disk which are covered by the checkpoint.
+
+        Args:
+            mmap (bool): Memory-map the file instead of reading it.
+
+        Returns:
+            ndarray: The records, with dtype RECORD, in completion order.
+        '''
+        self._read_checkpoint()
+        n = self.size // RECORD.itemsize
+        if mmap:
+            if n == 0:
+                return np.zeros(0, dtype=RECORD)
+            return np.memmap(self.path, dtype=RECORD, mode='r', shape=(n,))
+        return np.fromfile(self.path, dtype=RECORD, count=n)
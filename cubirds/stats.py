@@ -0,0 +1,190 @@
+import math
+import numpy as np
+
+from .catalog import BIRD_INDEX, BIRDS, MAX_PLAYERS, N_BIRDS
+from .events import Deal, Flock, GameEnd, Lay, RoundEnd
+
+CONDITIONS = ('species', 'triples', 'no cards')
+
+
+def wilson_interval(successes, n, z=1.96):
+    '''Wilson score confidence interval of a proportion (95% by default).
+
+    Returns:
+        (float, float): The bounds of the interval, (0, 1) if n is 0.
+    '''
+    if n == 0:
+        return 0., 1.
+    p = successes / n
+    center = (p + z**2 / (2 * n)) / (1 + z**2 / n)
+    half = z * math.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / (1 + z**2 / n)
+    return max(0., center - half), min(1., center + half)
+
+
+class PlayoutStats:
+    '''Online statistics over played games, in constant memory.
+
+    Games are added by passing the aggregator as the on_event hook of each
+    Game (games must then be played one after the other), or with add_game.
+    The hook must see the whole game, starting with its Deal event, so it
+    must be passed to the Game constructor: games made with Game.from_deal
+    or Game.decode, or whose hook is set later, are added with add_game.
+    Aggregators from different workers are combined with merge or +, and
+    summary can be called at any time.
+
+    Example:
+        stats = PlayoutStats()
+        for seed in range(1000):
+            playout(Game(3, verbose=False, rng=seed, on_event=stats))
+        print(stats.report())
+
+    Attributes:
+        n_games (ndarray): Number of games by number of players.
+        wins (ndarray): (MAX_PLAYERS + 1, MAX_PLAYERS) wins by number of
+            players and seat.
+        conditions (ndarray): Number of games ended by each of CONDITIONS.
+        lengths (ndarray): Histogram of the number of turns per game. The
+            last bin counts longer games.
+        rounds (ndarray): Histogram of the number of rounds per game, with
+            the same overflow bin.
+        flocks (ndarray): (N_BIRDS, 2) small and big flocks made of each bird.
+    '''
+    def __init__(self, max_moves=1024, max_rounds=64):
+        '''Args:
+            max_moves (int): Longest game length with its own histogram bin.
+            max_rounds (int): Largest number of rounds with its own bin.
+        '''
+        self.n_games = np.zeros(MAX_PLAYERS + 1, dtype=np.int64)
+        self.wins = np.zeros((MAX_PLAYERS + 1, MAX_PLAYERS), dtype=np.int64)
+        self.conditions = np.zeros(len(CONDITIONS), dtype=np.int64)
+        self.lengths = np.zeros(max_moves + 2, dtype=np.int64)
+        self.rounds = np.zeros(max_rounds + 2, dtype=np.int64)
+        self.flocks = np.zeros((N_BIRDS, 2), dtype=np.int64)
+        self._game = None
+
+    def add_game(self, n_players, winner, n_moves, n_rounds, condition):
+        '''Add a finished game.
+
+        Args:
+            n_players (int): The number of players.
+            winner (int): The winning seat, or None for a draw.
+            n_moves (int): The number of turns played.
+            n_rounds (int): The number of rounds, starting at 1.
+            condition (str): How the game ended, one of CONDITIONS.
+        '''
+        self.n_games[n_players] += 1
+        if winner is not None:
+            self.wins[n_players, winner] += 1
+        self.conditions[CONDITIONS.index(condition)] += 1
+        self.lengths[min(n_moves, len(self.lengths) - 1)] += 1
+        self.rounds[min(n_rounds, len(self.rounds) - 1)] += 1
+
+    def add_flock(self, bird, big):
+        '''Add a flock, big if it collected two birds.'''
+        self.flocks[BIRD_INDEX[bird], int(big)] += 1
+
+    def __call__(self, event):
+        '''Update the statistics with an event of the game being played.
+
+        Raises:
+            ValueError: If the Deal event of the game was not seen.
+        '''
+        if self._game is None and not isinstance(event, Deal):
+            raise ValueError('PlayoutStats missed the Deal event of the game: pass it as '
+                             'the on_event argument of Game, or use add_game.')
+        if isinstance(event, Lay):
+            self._game[1] += 1
+        elif isinstance(event, Flock):
+            self.add_flock(event.bird, event.kind == 'big')
+        elif isinstance(event, RoundEnd):
+            self._game[2] += 1
+        elif isinstance(event, Deal):
+            # n_players, n_moves, n_rounds
+            self._game = [len(event.hands), 0, 1]
+        elif isinstance(event, GameEnd):
+            n_players, n_moves, n_rounds = self._game
+            self.add_game(n_players, event.winner, n_moves, n_rounds, event.reason)
+            self._game = None
+
+    def merge(self, other):
+        '''Add the statistics of other to self and return self.
+
+        Raises:
+            ValueError: If the histograms do not have the same bins.
+        '''
+        if (len(self.lengths), len(self.rounds)) != (len(other.lengths), len(other.rounds)):
+            raise ValueError('Cannot merge histograms with different bins.')
+        for name in ('n_games', 'wins', 'conditions', 'lengths', 'rounds', 'flocks'):
+            getattr(self, name)[...] += getattr(other, name)
+        return self
+
+    def __add__(self, other):
+        return PlayoutStats(len(self.lengths) - 2, len(self.rounds) - 2).merge(self).merge(other)
+
+    def to_dict(self):
+        '''Lists of the counters, which can be saved as JSON.'''
+        return {name: getattr(self, name).tolist() for name in
+                ('n_games', 'wins', 'conditions', 'lengths', 'rounds', 'flocks')}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls(len(d['lengths']) - 2, len(d['rounds']) - 2)
+        for name, value in d.items():
+            getattr(stats, name)[...] = value
+        return stats
+
+    def summary(self):
+        '''Summarize the statistics.
+
+        Returns:
+            dict: The number of games, the draw rate, the share of each win
+                condition, mean and quantiles of the game length, the mean
+                number of rounds, the win rate of each seat with its 95%
+                confidence interval for each number of players, and the
+                number of flocks of each bird with the share of big ones.
+        '''
+        n = int(self.n_games.sum())
+        if n == 0:
+            return {'games': 0}
+        moves = np.arange(len(self.lengths))
+        cumulative = np.cumsum(self.lengths) / n
+        seats = {}
+        for n_players in np.flatnonzero(self.n_games):
+            games = int(self.n_games[n_players])
+            seats[int(n_players)] = [
+                {'win_rate': wins / games, 'ci': wilson_interval(int(wins), games)}
+                for wins in self.wins[n_players, :n_players]]
+        flocks = {}
+        for bird, (small, big) in zip(BIRDS, self.flocks.tolist()):
+            flocks[bird] = {'flocks': small + big,
+                            'big_rate': big / (small + big) if small + big else 0.}
+        return {
+            'games': n,
+            'draw_rate': self.conditions[CONDITIONS.index('no cards')] / n,
+            'conditions': {c: self.conditions[i] / n for i, c in enumerate(CONDITIONS)},
+            'moves_mean': float(moves @ self.lengths / n),
+            'moves_quantiles': {q: int(np.searchsorted(cumulative, q))
+                                for q in (0.05, 0.25, 0.5, 0.75, 0.95)},
+            'rounds_mean': float(np.arange(len(self.rounds)) @ self.rounds / n),
+            'seats': seats,
+            'flocks': flocks,
+        }
+
+    def report(self):
+        '''Format summary as text.'''
+        s = self.summary()
+        if s['games'] == 0:
+            return 'No games.'
+        out = [
+            'Games: {}'.format(s['games']),
+            'Turns: mean {:.1f}, quantiles {}'.format(
+                s['moves_mean'], ', '.join('{}: {}'.format(q, v) for q, v in s['moves_quantiles'].items())),
+            'Rounds: mean {:.2f}'.format(s['rounds_mean']),
+            'Endings: ' + ', '.join('{} {:.1%}'.format(c, r) for c, r in s['conditions'].items()),
+        ]
+        for n_players, seats in s['seats'].items():
+            out.append('{} players, win rate by seat: '.format(n_players) + ', '.join(
+                '{:.1%} [{:.1%}, {:.1%}]'.format(seat['win_rate'], *seat['ci']) for seat in seats))
+        out.append('Flocks (big rate): ' + ', '.join(
+            '{} {} ({:.0%})'.format(bird, f['flocks'], f['big_rate']) for bird, f in s['flocks'].items()))
+        return '\n'.join(out)
@@ -0,0 +1,166 @@
+'''Matches between agents, stopped by a sequential probability ratio test.
+
+An agent is anything called as agent(game) to play a full turn (lay, then
+flock) for the current player, like random_moves.random_turn, greedy_turn,
+ISMCTSAgent or PlannerAgent.
+
+A match puts agent a in one seat and agent b in every other seat, and plays
+rounds of n_players games: the same cards (common random numbers) with a
+moving through every seat. The cards come from their own generator
+(Game.deck_rng), so the deal and every later draw of a round are the same
+whatever randomness the agents use, which comes from game.rng. The games of a round share their deal, so they
+are not independent: the test takes the share of the decided games of each
+round won by a as one observation, compares these shares with the share
+1 / n_players of agents of equal strength, and stops the match as soon as
+one agent is clearly stronger.
+
+Example:
+    agents = {'random': random_turn, 'greedy': greedy_turn}
+    for key, result in tournament(agents, n_players=(2, 3)).items():
+        print(key, result)
+'''
+from collections import namedtuple
+import itertools as it
+import math
+import numpy as np
+
+from .catalog import BIRD_INDEX
+from .game import Game
+from .game_analysis import available_flocks, available_moves
+from .planner import progress
+
+MatchResult = namedtuple('MatchResult', ['wins', 'losses', 'draws', 'games', 'llr', 'winner'])
+MatchResult.__doc__ = '''The outcome of a match between agents a and b.
+
+Attributes:
+    wins (int): Games won by a.
+    losses (int): Games won by one of the b seats.
+    draws (int): Games which ended for lack of cards.
+    games (int): Games played.
+    llr (float): Final log-likelihood ratio of the test, over rounds.
+    winner (str): 'a' or 'b' for the agent found stronger, or None if the
+                  match reached max_rounds undecided.
+'''
+
+
+def sprt_bounds(alpha=0.05, beta=0.05):
+    '''Lower and upper log-likelihood ratio bounds of Wald's test, alpha
+    and beta being the error rates of deciding for each agent wrongly.
+    '''
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+def sprt_llr(wins, losses, p0, p1):
+    '''Log-likelihood ratio of a win rate of p1 against p0, given the wins and
+    losses. They may be fractional, e.g. the shares of a pooled round.
+    '''
+    return wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+
+def play(game, agents):
+    '''Play game to the end, agents[p] playing the turns of player p.'''
+    while not game.end:
+        agents[game.current_player](game)
+    return game.winner
+
+def play_match(a, b, n_players=2, n_rows=4, delta=0.05, alpha=0.05, beta=0.05,
+               max_rounds=1000, seed=0):
+    '''Play a against b until the test decides.
+
+    The test weighs a win rate of 1 / n_players + delta for a against
+    1 / n_players - delta, with one observation per round (see the module
+    docstring).
+
+    Args:
+        a, b: The agents.
+        n_players (int): Number of players of the games.
+        n_rows (int): Number of rows of the games.
+        delta (float): Difference of win rate from equal strength which the
+            test should detect.
+        alpha (float): Probability of finding a stronger when it is not.
+        beta (float): Probability of finding b stronger when it is not.
+        max_rounds (int): Maximum number of rounds of n_players games.
+        seed (int): Seed of the cards and of game.rng. Matches with the same
+            seed play the same cards.
+
+    Returns:
+        MatchResult: The outcome of the match.
+    '''
+    share = 1 / n_players
+    p0, p1 = share - delta, share + delta
+    assert 0 < p0 and p1 < 1, 'delta is too large for {} players.'.format(n_players)
+    lower, upper = sprt_bounds(alpha, beta)
+    wins = losses = draws = 0
+    llr = 0.
+    for n_round in range(max_rounds):
+        round_wins = round_losses = 0
+        deck_seed, agent_seed = np.random.SeedSequence([seed, n_round]).spawn(2)
+        for seat in range(n_players):
+            agents = [b] * n_players
+            agents[seat] = a
+            game = Game(n_players, n_rows, verbose=False, rng=agent_seed, deck_rng=deck_seed)
+            winner = play(game, agents)
+            if winner is None:
+                draws += 1
+            elif winner == seat:
+                round_wins += 1
+            else:
+                round_losses += 1
+        wins += round_wins
+        losses += round_losses
+
+        decided = round_wins + round_losses
+        if decided == 0:
+            continue
+        llr += sprt_llr(round_wins / decided, round_losses / decided, p0, p1)
+        if llr >= upper or llr <= lower:
+            return MatchResult(wins, losses, draws, wins + losses + draws, llr,
+                               'a' if llr >= upper else 'b')
+    return MatchResult(wins, losses, draws, wins + losses + draws, llr, None)
+
+def tournament(agents, n_players=(2, 3, 4, 5), **kwargs):
+    '''Play a match between every pair of agents for every number of
+    players, all on the same deals.
+
+    Args:
+        agents (dict): Agents with their names as keys.
+        n_players (iterable): Numbers of players.
+        **kwargs: Passed to play_match.
+
+    Returns:
+        dict: MatchResults with (name of a, name of b, number of players) as
+            keys.
+    '''
+    results = {}
+    for n in n_players:
+        for (name_a, a), (name_b, b) in it.combinations(agents.items(), 2):
+            results[(name_a, name_b, n)] = play_match(a, b, n, **kwargs)
+    return results
+
+def _flock_score(options):
+    # Big flocks count twice, like the birds they collect.
+    return max([2 if option.startswith('big') else 1 for option in options], default=0)
+
+def greedy_turn(game):
+    '''Play the lay giving the best expected flock (over the cards the player
+    cannot see for lays which draw), then the flock bringing the collection
+    closest to a win.
+    '''
+    scores = {}
+    for lay, outcome in available_moves(game, counts='invisible').items():
+        if isinstance(outcome, dict):
+            scores[lay] = sum(p * _flock_score(options) for options, p in outcome.items())
+        else:
+            scores[lay] = _flock_score(outcome)
+    game.lay(*max(scores, key=scores.get))
+    if game.end:
+        return
+
+    best, best_progress = None, -1.
+    collection = game.current_collection.counts
+    for bird, flock in available_flocks(game.current_hand).items():
+        if flock:
+            counts = list(collection)
+            counts[BIRD_INDEX[bird]] += flock
+            value = progress(tuple(counts))
+            if value > best_progress:
+                best, best_progress = bird, value
+    game.flock(best)
@@ -0,0 +1,181 @@
+import numpy as np
+
+from .catalog import BIRD_INDEX, MAX_PLAYERS, N_BIRDS, N_CARDS
+
+MAX_ROWS = 8
+MAX_CARDS = N_CARDS
+
+# Zones of the game hashed separately: deck, discard, then one zone per hand,
+# collection and row.
+DECK = 0
+DISCARD = 1
+N_ZONES = 2 + 2 * MAX_PLAYERS + MAX_ROWS
+
+# Zobrist keys. Stacks use KEYS[zone][bird * (MAX_CARDS + 1) + count] and rows
+# KEYS[zone][position * N_BIRDS + bird]; an empty zone hashes to 0.
+_rng = np.random.default_rng(0x2b1d5)
+KEYS = _rng.integers(1, 2**64, (N_ZONES, N_BIRDS * (MAX_CARDS + 1)),
+                     dtype=np.uint64).tolist()
+PLAYER_KEYS = _rng.integers(1, 2**64, MAX_PLAYERS, dtype=np.uint64).tolist()
+FLOCK_KEY = int(_rng.integers(1, 2**64, dtype=np.uint64))
+del _rng
+
+
+def hand_zone(player):
+    return 2 + player
+
+def collection_zone(player):
+    return 2 + MAX_PLAYERS + player
+
+def row_zone(n_row):
+    return 2 + 2 * MAX_PLAYERS + n_row
+
+def check_size(game):
+    '''Raise a ValueError if game has more players or rows than the keys
+    cover.
+    '''
+    if game.n_players > MAX_PLAYERS or game.n_rows > MAX_ROWS:
+        raise ValueError('Only games of up to {} players and {} rows can be hashed, not {} '
+                         'and {}.'.format(MAX_PLAYERS, MAX_ROWS, game.n_players, game.n_rows))
+
+def zones(game):
+    '''All the zones used by game.'''
+    players = range(game.n_players)
+    return ([DECK, DISCARD] + [hand_zone(p) for p in players]
+            + [collection_zone(p) for p in players]
+            + [row_zone(n_row) for n_row in range(game.n_rows)])
+
+def zone_hash(game, zone):
+    '''Hash of the content of one zone of game.'''
+    keys = KEYS[zone]
+    h = 0
+    if zone >= row_zone(0):
+        for position, bird in enumerate(game.board[zone - row_zone(0)]):
+            h ^= keys[position * N_BIRDS + BIRD_INDEX[bird]]
+        return h
+
+    if zone == DECK:
+        stack = game.deck
+    elif zone == DISCARD:
+        stack = game.discard
+    elif zone < collection_zone(0):
+        stack = game.hands[zone - hand_zone(0)]
+    else:
+        stack = game.collections[zone - collection_zone(0)]
+    for i, count in enumerate(stack.counts):
+        if count:
+            h ^= keys[i * (MAX_CARDS + 1) + count]
+    return h
+
+def turn_key(game):
+    '''Key of whose turn it is and of the phase of the turn.'''
+    key = PLAYER_KEYS[game.current_player]
+    return key ^ FLOCK_KEY if game.current_phase == 'flock' else key
+
+
+class TranspositionTable:
+    '''A bounded table of search results indexed by position hashes (see
+    Game.hash), which several searches or agents can share.
+
+    Entries go in buckets of two slots. The first slot keeps the entry with
+    the largest weight (e.g. search depth or number of visits) and the second
+    one always takes the newest entry, so that deep results survive while
+    recent ones stay available.
+
+    Example:
+        table = TranspositionTable(2**16)
+        value = table.get(game.hash)
+        if value is None:
+            value = evaluate(game)
+            table.put(game.hash, value, weight=depth)
+        print(table.stats())
+    '''
+    def __init__(self, size=2**20):
+        '''Args:
+            size (int): Maximum number of entries, rounded up to a power of 2.
+        '''
+        n_buckets = 1
+        while 2 * n_buckets < size:
+            n_buckets *= 2
+        self._mask = n_buckets - 1
+        self.size = 2 * n_buckets
+        self.clear()
+
+    def clear(self):
+        '''Remove all entries and reset the statistics.'''
+        self._keys = [None] * self.size
+        self._values = [None] * self.size
+        self._weights = [0] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def _slots(self, key):
+        i = 2 * (key & self._mask)
+        return i, i + 1
+
+    def get(self, key, default=None):
+        '''Return the value stored for key, or default.'''
+        for i in self._slots(key):
+            if self._keys[i] == key:
+                self.hits += 1
+                return self._values[i]
+        self.misses += 1
+        return default
+
+    def __contains__(self, key):
+        return any(self._keys[i] == key for i in self._slots(key))
+
+    def put(self, key, value, weight=0):
+        '''Store value for key.
+
+        Args:
+            key (int): The position hash.
+            value: Anything.
+            weight (int): Importance of the entry. An entry only takes the
+                first slot of its bucket from an entry of lower or equal
+                weight.
+        '''
+        first, second = self._slots(key)
+        keys = self._keys
+        self.stores += 1
+        if keys[first] in (None, key) or weight >= self._weights[first]:
+            slot = first
+            if keys[first] not in (None, key):
+                # Demote the previous entry instead of losing it.
+                if keys[second] not in (None, key):
+                    self.replacements += 1
+                keys[second] = keys[first]
+                self._values[second] = self._values[first]
+                self._weights[second] = self._weights[first]
+            elif keys[second] == key:
+                keys[second] = None
+        else:
+            slot = second
+            if keys[second] not in (None, key):
+                self.replacements += 1
+        keys[slot] = key
+        self._values[slot] = value
+        self._weights[slot] = weight
+
+    def __len__(self):
+        return self.size - self._keys.count(None)
+
+    def stats(self):
+        '''Usage statistics of the table.
+
+        Returns:
+            dict: Lookups, hits, misses, hit rate, stores, entries evicted by
+                a replacement and the fraction of the table in use.
+        '''
+        lookups = self.hits + self.misses
+        return {
+            'lookups': lookups,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.,
+            'stores': self.stores,
+            'replacements': self.replacements,
+            'fill': len(self) / self.size,
+        }
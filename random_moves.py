@@ -1,41 +1,45 @@
-import numpy as np
-from random import shuffle
-from .utils import card_data
-from .cubirds.cards import UnorderedCards
 from .cubirds.game import Game
 from .cubirds.game_analysis import available_lays, available_flocks
 
-def random_turn(game):
+def random_choice(options, rng):
+    '''Return an element of the sequence options chosen uniformly with rng.
+    Cheaper than rng.choice for short Python lists.
+    '''
+    return options[int(rng.random() * len(options))]
+
+def random_turn(game, rng=None):
     '''Make a random lay and flock (if one is available) action.
 
     Args:
         game (Game): A game of Cubirds. Current phase must be 'lay'.
+        rng (np.random.Generator): Source of randomness of the choices.
+            Defaults to the game's generator, so that a seeded game played
+            with random moves is reproducible.
     '''
     assert game.current_phase == 'lay'
+    rng = game.rng if rng is None else rng
 
     hand = game.current_hand
     board = game.board
     lays = available_lays(hand, board)
     lays = list(lays.keys())
-    shuffle(lays)
-    game.lay(*lays[0], draw=True)
+    game.lay(*random_choice(lays, rng), draw=True)
 
     hand = game.current_hand
     flocks = available_flocks(hand)
     flocks = {k: v for k, v in flocks.items() if v >= 1}
     if flocks:
         flocks = list(flocks.keys())
-        shuffle(flocks)
-        game.flock(flocks[0])
+        game.flock(random_choice(flocks, rng))
     else:
         game.flock(None)
 
-def playout(game):
+def playout(game, rng=None):
     '''Playout a game of Cubirds with random moves until the end of the game.
     '''
     n_moves = 0
     while not game.end:
-        random_turn(game)
+        random_turn(game, rng)
         n_moves += 1
         # if n_moves > 40:
             # print('n_moves:', n_moves)
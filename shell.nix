@@ -6,7 +6,7 @@ let
   }) {};
 
   pythonDeps = pythonPackages: with pythonPackages; [
-    numpy multiset
+    numpy
     pytest pytest-benchmark
   ];
 
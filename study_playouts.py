@@ -1,27 +1,40 @@
-import multiprocessing as mp
+import os
+import sys
 
-import pandas as pd
-from matplotlib import pyplot as plt
-import seaborn as sns
-from tqdm import tqdm
+if '--profile' in sys.argv:
+    # Timers are only compiled in when this is set at import time.
+    os.environ.setdefault('CUBIRDS_PROFILE', '1')
 
-from cubirds.game import Game
-from random_moves import playout
+from .cubirds.runner import PlayoutRunner
 
-def build_srs_iter(_):
-    game = Game(3, 4, verbose=False)
-    _, n_moves = playout(game)
-    return n_moves
+def build_n_moves_srs(n=500, path='playouts.bin', profile=False, **kwargs):
+    '''Play n random 3-player games (or resume a previous run with the same
+    parameters) and return the number of turns of each game as a Series.
+    Print the summary statistics of the study and, with profile, where the
+    time went.
+    '''
+    import pandas as pd
 
-def build_n_moves_srs(n=500):
-    with mp.Pool(8) as pool:
-        srs = list(tqdm(pool.imap(build_srs_iter, range(n)), total=n))
-    # srs = [build_srs_iter(i) for i in tqdm(range(n))]
-    srs = pd.Series(srs)
-    return srs
+    runner = PlayoutRunner(path, n, n_players=3, n_rows=4, profile=profile,
+                          stats=True, **kwargs)
+    runner.run(progress=True)
+    print(runner.stats.report())
+    if profile:
+        print(runner.profile.report(runner.wall_time))
+    records = runner.load(mmap=True)
+    return pd.Series(records['n_moves'])
 
 if __name__ == '__main__':
-    srs = build_n_moves_srs(20000)
+    import argparse
+    from matplotlib import pyplot as plt
+    import seaborn as sns
+
+    parser = argparse.ArgumentParser(description='Study the length of random 3-player games.')
+    parser.add_argument('n', type=int, nargs='?', default=20000, help='number of games')
+    parser.add_argument('--profile', action='store_true',
+                        help='report where the time went (sets CUBIRDS_PROFILE)')
+    args = parser.parse_args()
+    srs = build_n_moves_srs(args.n, profile=args.profile)
     print(srs.describe())
     sns.distplot(srs)
     plt.show()
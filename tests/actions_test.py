@@ -0,0 +1,23 @@
+from ..cubirds.actions import decode_action, encode_move, legal_mask, n_actions
+from ..cubirds.game import Game
+from ..cubirds.ismcts import legal_moves
+from .game_test import random_move
+
+
+def test_actions():
+    for n_rows in (1, 4):
+        assert n_actions(n_rows) == 16 * n_rows + 9
+        for action in range(n_actions(n_rows)):
+            phase = 'lay' if action < 16 * n_rows else 'flock'
+            assert encode_move(decode_action(action, n_rows), phase, n_rows) == action
+    assert encode_move(('cube', 0, 'left'), 'lay', 4) == 0
+    assert encode_move(('sandwich', 1, 'right'), 'lay', 4) == 11
+    assert decode_action(64 + 8, 4) is None
+
+def test_legal_mask():
+    game = Game(3, verbose=False, rng=0)
+    while not game.end:
+        mask = legal_mask(game)
+        moves = [decode_action(action, game.n_rows) for action in mask.nonzero()[0]]
+        assert sorted(moves, key=str) == sorted(legal_moves(game), key=str)
+        game.apply(random_move(game))
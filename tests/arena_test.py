@@ -0,0 +1,62 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from ..cubirds.arena import Arena, random_agent, value_agent
+from ..cubirds.game import Game, encoded_size
+
+
+def make_evaluator(sizes):
+    weights = np.random.default_rng(0).normal(size=512)
+
+    def evaluator(observations):
+        sizes.append(observations.shape)
+        return observations.astype(np.float32) @ weights[:observations.shape[1]]
+    return evaluator
+
+def test_arena():
+    sizes = []
+    arena = Arena(make_evaluator(sizes))
+    games = [Game(2, verbose=False, rng=seed) for seed in range(10)]
+    games += [Game(3, verbose=False, rng=seed) for seed in range(10)]
+    results = arena.play_games(games, [value_agent, random_agent, value_agent])
+    assert all(game.end for game in games)
+    assert [winner for winner, _ in results] == [game.winner for game in games]
+
+    # Positions of all the games are evaluated together, in batches of a
+    # single shape.
+    assert {size for _, size in sizes} == {encoded_size(2, 4) + 3, encoded_size(3, 4) + 4}
+    summary = arena.summary()
+    assert summary['requests'] == sum(n for n, _ in sizes)
+    assert summary['batch_size'] > 20
+
+def test_arena_max_batch():
+    sizes = []
+    # No request is larger than 8 birds * 4 rows * 2 sides.
+    arena = Arena(make_evaluator(sizes), max_batch=64)
+    games = [Game(2, verbose=False, rng=seed) for seed in range(20)]
+    arena.play_games(games, [value_agent, value_agent])
+    assert max(n for n, _ in sizes) <= 64
+
+def test_arena_evaluate():
+    arena = Arena(lambda observations: observations.sum(1))
+    game = Game(3, verbose=False, rng=0)
+
+    async def agent(game, arena):
+        value = await arena.evaluate(game)
+        assert value == sum(game.encode_observation(game.current_player))
+        return await random_agent(game, arena)
+
+    winner, n_moves = arena.play_games([game], [agent] * 3)[0]
+    assert game.end and n_moves > 0
+    assert arena.n_batches == arena.n_requests
+
+def test_arena_evaluator_error():
+    def evaluator(observations):
+        raise ValueError('bad model')
+
+    arena = Arena(evaluator)
+    games = [Game(2, verbose=False, rng=seed) for seed in range(5)]
+    with pytest.raises(ValueError, match='bad model'):
+        arena.play_games(games, [value_agent, value_agent])
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from ..cubirds.batch import BatchGame, EMPTY, LEFT, RIGHT
+from ..cubirds.cards import BIRD_INDEX, N_BIRDS, get_deck
+from ..cubirds.game import Game
+from ..random_moves import playout
+
+
+def counts(birds):
+    out = np.zeros(N_BIRDS, dtype=np.int64)
+    for bird in birds:
+        out[BIRD_INDEX[bird]] += 1
+    return out
+
+def set_row(batch, n_game, n_row, birds):
+    batch.rows[n_game, n_row] = EMPTY
+    batch.rows[n_game, n_row, :len(birds)] = [BIRD_INDEX[b] for b in birds]
+    batch.row_len[n_game, n_row] = len(birds)
+
+def get_row(batch, n_game, n_row):
+    birds = list(BIRD_INDEX)
+    return [birds[i] for i in batch.rows[n_game, n_row, :batch.row_len[n_game, n_row]]]
+
+def n_cards(batch):
+    return (batch.deck.sum(1) + batch.discard.sum(1) + batch.hands.sum((1, 2))
+            + batch.collections.sum((1, 2)) + batch.row_len.sum(1))
+
+def test_batch_setup():
+    batch = BatchGame(100, n_players=3, n_rows=4, rng=np.random.default_rng(0))
+    assert (batch.hands.sum(2) == 8).all()
+    assert (batch.collections.sum(2) == 1).all()
+    assert (batch.row_len == 3).all()
+    for n_game in range(batch.n_games):
+        for n_row in range(batch.n_rows):
+            assert len(set(get_row(batch, n_game, n_row))) == 3
+    assert (n_cards(batch) == len(get_deck())).all()
+
+def test_batch_game_example():
+    # Same game as game_test.test_game_example, played on both sides.
+    batch = BatchGame(2, n_players=1, n_rows=1, rng=np.random.default_rng(0))
+    batch.deck[:] = counts(['sparrow'])
+    set_row(batch, 0, 0, ['parrot', 'parrot', 'parrot', 'parrot', 'cube'])
+    set_row(batch, 1, 0, ['cube', 'parrot', 'parrot', 'parrot', 'parrot'])
+    batch.hands[:, 0] = counts(['cube', 'cube', 'sandwich'])
+
+    cube = np.full(2, BIRD_INDEX['cube'])
+    batch.lay(cube, np.zeros(2, dtype=int), np.array([LEFT, RIGHT]))
+    assert (batch.deck == 0).all()
+    assert get_row(batch, 0, 0) == ['cube', 'cube', 'cube', 'sparrow']
+    assert get_row(batch, 1, 0) == ['cube', 'cube', 'cube', 'sparrow']
+
+    batch.flock(np.full(2, BIRD_INDEX['parrot']))
+    assert (batch.hands[:, 0] == counts(['sandwich'])).all()
+    assert (batch.collections[:, 0, BIRD_INDEX['parrot']] >= 1).all()
+    assert (batch.discard[:, BIRD_INDEX['parrot']] == 3).all()
+
+def test_batch_lay_draw():
+    batch = BatchGame(2, n_players=2, n_rows=1, rng=np.random.default_rng(0))
+    set_row(batch, 0, 0, ['cube', 'sandwich', 'sparrow'])
+    set_row(batch, 1, 0, ['cube', 'sandwich', 'duck'])
+    batch.hands[:, 0] = counts(['duck', 'duck', 'hibou'])
+
+    duck = np.full(2, BIRD_INDEX['duck'])
+    batch.lay(duck, np.zeros(2, dtype=int), np.array([LEFT, RIGHT]))
+    assert get_row(batch, 0, 0) == ['duck', 'duck', 'cube', 'sandwich', 'sparrow']
+    assert get_row(batch, 1, 0) == ['cube', 'sandwich', 'duck', 'duck', 'duck']
+    assert (batch.hands[:, 0].sum(1) == 3).all()
+    assert (batch.hands[:, 0, BIRD_INDEX['hibou']] >= 1).all()
+
+def test_batch_playout():
+    batch = BatchGame(500, n_players=3, n_rows=4, rng=np.random.default_rng(1))
+    winner, n_moves = batch.playout()
+    assert batch.end.all()
+    assert ((winner >= -1) & (winner < 3)).all()
+    assert (n_moves > 0).all()
+    assert (n_cards(batch) == len(get_deck())).all()
+
+def outcome(collections, winner):
+    '''How a game ended, from its final collections.'''
+    if winner < 0:
+        return 'no cards'
+    return 'species' if (np.asarray(collections[winner]) > 0).sum() >= 7 else 'triples'
+
+def test_batch_matches_game():
+    rng = np.random.default_rng(0)
+    game_moves = []
+    game_outcomes = []
+    for _ in range(600):
+        game = Game(3, 4, verbose=False, rng=rng)
+        winner, n_moves = playout(game)
+        winner = -1 if winner is None else winner
+        game_moves.append(n_moves)
+        game_outcomes.append((winner, outcome([game.collections[p].counts for p in range(3)],
+                                              winner)))
+    batch = BatchGame(3000, n_players=3, n_rows=4, rng=np.random.default_rng(0))
+    batch_winners, batch_moves = batch.playout()
+    batch_outcomes = [(winner, outcome(collections, winner))
+                      for winner, collections in zip(batch_winners.tolist(), batch.collections)]
+
+    # Mean game lengths should agree within a few standard errors.
+    se = np.std(game_moves) / np.sqrt(len(game_moves))
+    assert abs(np.mean(game_moves) - batch_moves.mean()) < 4 * se
+
+    # So should the rates of draws, of wins of each seat and of each win
+    # condition.
+    events = [lambda o: o[0] == -1, lambda o: o[0] == 0, lambda o: o[0] == 1,
+              lambda o: o[0] == 2, lambda o: o[1] == 'species', lambda o: o[1] == 'triples']
+    n, m = len(game_outcomes), len(batch_outcomes)
+    for event in events:
+        p = np.mean([event(o) for o in game_outcomes])
+        q = np.mean([event(o) for o in batch_outcomes])
+        pooled = (p * n + q * m) / (n + m)
+        se = np.sqrt(pooled * (1 - pooled) * (1 / n + 1 / m))
+        assert abs(p - q) < 4 * se + 1e-9
+
+def test_perf_batch_playout(benchmark):
+    def create_and_play():
+        BatchGame(1000, 3, 4).playout()
+    benchmark(create_and_play)
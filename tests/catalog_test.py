@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from ..cubirds import catalog
+from ..cubirds.cards import get_deck
+from ..utils import card_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(ROOT)
+
+
+def test_catalog():
+    assert catalog.BIRDS == tuple(card_data)
+    for i, bird in enumerate(catalog.BIRDS):
+        assert catalog.BIRD_INDEX[bird] == i
+        assert catalog.COUNT[i] == card_data[bird]['count']
+        assert catalog.SMALL[i] == card_data[bird]['small']
+        assert catalog.BIG[i] == card_data[bird]['big']
+    assert catalog.N_CARDS == len(get_deck()) == 110
+
+    assert (catalog.BIG_ARRAY == catalog.BIG).all()
+    assert catalog.COUNT_ARRAY is catalog.COUNT_ARRAY
+    with pytest.raises(ValueError):
+        catalog.SMALL_ARRAY[0] = 0
+    with pytest.raises(AttributeError):
+        catalog.MEDIUM_ARRAY
+
+def import_game(cwd):
+    '''Import the game module in a fresh interpreter started in cwd.'''
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(ROOT))
+    subprocess.run([sys.executable, '-c', 'import {}.cubirds.game'.format(PACKAGE)],
+                   cwd=cwd, env=env, check=True)
+
+def test_import_from_anywhere(tmp_path):
+    import_game(str(tmp_path))
+
+def test_perf_import(benchmark, tmp_path):
+    benchmark.pedantic(import_game, args=(str(tmp_path),), rounds=10)
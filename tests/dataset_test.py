@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+from ..cubirds.actions import encode_move
+from ..cubirds.dataset import (DatasetSampler, DatasetWriter, record_dtype,
+                               search_policy, selfplay)
+from ..cubirds.game import Game
+from ..cubirds.ismcts import legal_moves
+
+
+def test_search_policy():
+    game = Game(2, verbose=False, rng=0)
+    move, policy = search_policy(game, iterations=30, rng=0)
+    assert policy.sum() == pytest.approx(1)
+    assert move in legal_moves(game)
+    assert policy[encode_move(move, 'lay', game.n_rows)] == policy.max()
+
+def test_dataset(tmp_path):
+    directory = str(tmp_path / 'selfplay')
+    with DatasetWriter(directory, n_players=2, shard_size=50) as writer:
+        selfplay(writer, 3, iterations=5, seed=0)
+    n_records = writer.n_records
+    assert writer.meta['n_games'] == 3
+    assert len(writer.meta['shards']) == -(-n_records // 50)
+
+    sampler = DatasetSampler(directory, rng=0)
+    assert len(sampler) == n_records
+    records = np.concatenate([sampler.shard(i) for i in range(len(sampler.shards))])
+    assert records.dtype == record_dtype(2, 4)
+    assert list(np.unique(records['game'])) == [0, 1, 2]
+    assert (records['policy'].sum(1) == pytest.approx(1))
+    # The search only puts probability on legal actions.
+    assert not (records['policy'] * ~records['mask']).any()
+    assert set(np.unique(records['outcome'])) <= {-1, 0, 1}
+
+    batch = sampler.sample(64)
+    assert len(batch) == 64
+    assert all((records == row).any() for row in batch)
+
+    # Positions of an unfinished game are not kept, and an interrupted
+    # write is dropped when the dataset is reopened.
+    writer = DatasetWriter(directory, n_players=2, shard_size=50)
+    game = Game(2, verbose=False, rng=0)
+    writer.add_position(game, np.full(41, 1 / 41))
+    writer.close()
+    with open(os.path.join(directory, writer.meta['shards'][-1][0]), 'ab') as file:
+        file.write(b'\1' * 10)
+    writer = DatasetWriter(directory, n_players=2, shard_size=50)
+    selfplay(writer, 1, iterations=5, seed=1)
+    sampler.refresh()
+    assert len(sampler) == writer.n_records > n_records
+    assert set(np.unique(sampler.sample(500)['game'])) <= {0, 1, 2, 3}
+
+    with pytest.raises(ValueError):
+        DatasetWriter(directory, n_players=3)
+
+def test_dataset_orphan_shards(tmp_path):
+    directory = str(tmp_path / 'selfplay')
+    # A crash before the first update of meta.json leaves a shard it does
+    # not list.
+    writer = DatasetWriter(directory, n_players=2, shard_size=50)
+    writer._write_meta()
+    with open(os.path.join(directory, 'shard_00000.bin'), 'wb') as file:
+        file.write(b'\1' * 1000)
+    writer = DatasetWriter(directory, n_players=2, shard_size=50)
+    assert not os.path.exists(os.path.join(directory, 'shard_00000.bin'))
+    selfplay(writer, 1, iterations=5, seed=0)
+
+    # Same for a crash while starting a new shard.
+    name = 'shard_{:05d}.bin'.format(len(writer.meta['shards']))
+    with open(os.path.join(directory, name), 'wb') as file:
+        file.write(b'\1' * 1000)
+    writer = DatasetWriter(directory, n_players=2, shard_size=50)
+    selfplay(writer, 2, iterations=5, seed=1)
+    itemsize = writer.dtype.itemsize
+    for name, n_records in writer.meta['shards']:
+        assert os.path.getsize(os.path.join(directory, name)) == n_records * itemsize
+    records = DatasetSampler(directory).sample(500)
+    assert set(np.unique(records['game'])) <= {0, 1, 2}
+    assert (records['policy'].sum(1) == pytest.approx(1))
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from ..cubirds.cards import get_deck
+from ..cubirds.deal import DealPool, deal_batch
+from ..cubirds.game import Game
+from ..random_moves import playout
+
+
+def test_deal_batch():
+    deal = deal_batch(1000, n_players=3, n_rows=4, rng=np.random.default_rng(0))
+    assert deal.hands.shape == (1000, 3, 8)
+    assert (deal.hands.sum(2) == 8).all()
+    assert (deal.collections.sum(2) == 1).all()
+    assert (deal.deck >= 0).all()
+    for n_game in range(100):
+        for row in deal.board[n_game]:
+            assert len(set(row)) == 3
+
+    n_cards = (deal.deck.sum(1) + deal.discard.sum(1) + deal.hands.sum((1, 2))
+               + deal.collections.sum((1, 2)) + 3 * deal.board.shape[1])
+    assert (n_cards == len(get_deck())).all()
+
+def test_game_from_deal():
+    deal = deal_batch(2, n_players=2, n_rows=4, rng=np.random.default_rng(0))
+    game = Game.from_deal(deal, 1, verbose=False)
+    assert game.n_players == 2
+    assert game.n_rows == 4
+    assert list(game.hands[1].counts) == list(deal.hands[1, 1])
+    assert len(game.deck) == deal.deck[1].sum()
+    assert all(len(set(row)) == 3 for row in game.board.values())
+
+    winner, n_moves = playout(game)
+    assert game.end
+
+def test_deal_pool():
+    pool = DealPool(n_players=3, size=4, rng=np.random.default_rng(0))
+    games = [pool.next_game(verbose=False) for _ in range(6)]
+    assert len(pool) == 2
+    assert all(game.n_players == 3 for game in games)
+
+def test_perf_deal_batch(benchmark):
+    benchmark(deal_batch, 1000, 3, 4)
+
+def test_perf_create_game_from_pool(benchmark):
+    pool = DealPool(3, 4)
+    benchmark(pool.next_game, verbose=False)
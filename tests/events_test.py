@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from ..cubirds.cards import UnorderedCards
+from ..cubirds.events import (CompleteRow, Deal, Draw, EventLog, Flock, GameEnd, Lay,
+                              Reshuffle, RoundEnd)
+from ..cubirds.game import Game
+from ..random_moves import playout
+
+
+def test_events_playout():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        log = EventLog()
+        game = Game(3, verbose=False, rng=rng, on_event=log)
+        _, n_moves = playout(game)
+
+        events = list(log)
+        assert isinstance(events[0], Deal)
+        assert isinstance(events[-1], GameEnd)
+        assert events[-1].winner == game.winner
+        if game.winner is None:
+            assert events[-1].reason == 'no cards'
+        else:
+            assert events[-1].reason == game._check_win(game.collections[game.winner])
+        assert len(log.of_type(Deal)) == 1
+        assert len(log.of_type(GameEnd)) == 1
+        assert len(log.of_type(Lay)) == n_moves
+
+        # Collections can be rebuilt from the deal and the flocks.
+        collections = [UnorderedCards(c) for c in events[0].collections]
+        for flock in log.of_type(Flock):
+            collections[flock.player][flock.bird] += 2 if flock.kind == 'big' else 1
+        assert collections == [game.collections[p] for p in range(3)]
+
+        for event in log.of_type(RoundEnd):
+            assert all(len(hand) == 8 for hand in event.hands)
+        for event in log.of_type(Draw):
+            assert len(event.cards) <= 2
+
+def test_events_lay():
+    log = EventLog()
+    game = Game(n_players=2, n_rows=1, verbose=False, rng=0)
+    game.on_event = log
+    game.deck = UnorderedCards(['sparrow'])
+    game.discard = UnorderedCards(['duck', 'duck'])
+    game.board[0] = ['cube', 'sandwich']
+    game.hands[0] = UnorderedCards(['sandwich', 'toucan'])
+
+    game.lay('toucan', 0, 'right')
+    assert log.of_type(Lay) == [Lay(0, 'toucan', 1, 0, 'right', ())]
+    assert log.of_type(Reshuffle) == [Reshuffle(2)]
+    assert len(log.of_type(Draw)[0].cards) == 2
+    assert list(log)[-1] == Draw(0, tuple(game.hands[0] - ['sandwich']))
+
+def test_events_complete_row_and_draw_end():
+    log = EventLog()
+    game = Game(n_players=1, n_rows=1, verbose=False, rng=0, on_event=log)
+    game.deck = UnorderedCards(['duck'])
+    game.discard = UnorderedCards()
+    game.board[0] = ['sparrow', 'cube']
+    game.hands[0] = UnorderedCards(['cube'])
+
+    game.lay('cube', 0, 'left')
+    assert log.of_type(Lay)[0].captured == ('sparrow',)
+    assert list(game.board[0]) == ['cube', 'cube', 'duck']
+    assert log.of_type(CompleteRow) == [CompleteRow(0, ('duck',))]
+
+    game.flock(None)
+    game.hands[0] = UnorderedCards(['parrot'])
+    game.board[0] = ['cube', 'duck']
+    game.lay('parrot', 0, 'right')
+    assert game.end
+    assert log.of_type(GameEnd) == [GameEnd(None, 'no cards')]
+
+def test_event_log_maxlen():
+    log = EventLog(maxlen=5)
+    game = Game(3, verbose=False, rng=0, on_event=log)
+    playout(game)
+    assert len(log) == 5
+    assert isinstance(list(log)[-1], GameEnd)
+
+    clone = game.clone()
+    assert clone.on_event is None
+
+def test_perf_playout_traced(benchmark):
+    def create_and_play():
+        playout(Game(3, 4, verbose=False, on_event=EventLog(maxlen=1000)))
+    benchmark(create_and_play)
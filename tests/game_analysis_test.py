@@ -0,0 +1,140 @@
+import itertools as it
+
+import numpy as np
+import pytest
+
+from ..cubirds.cards import BIRDS, UnorderedCards, get_deck
+from ..cubirds.catalog import BIRD_INDEX
+from ..cubirds.game import Game
+from ..cubirds.game_analysis import (available_flocks, available_moves,
+                                     available_moves_batch, compute_lay,
+                                     draw_distribution, flock_cache_info,
+                                     flock_options, flocks_to_list, stack_states)
+from ..random_moves import random_turn
+from ..utils import card_data
+
+
+def test_draw_distribution():
+    counts = get_deck().counts
+    draws = draw_distribution(counts, 2)
+    assert len(draws) == 36
+    assert sum(proba for _, proba in draws) == pytest.approx(1)
+
+    # Same probabilities as drawing an ordered pair of cards.
+    total = sum(counts)
+    for first, second in it.product(range(len(BIRDS)), repeat=2):
+        draw = [0] * len(BIRDS)
+        draw[first] += 1
+        draw[second] += 1
+        proba = dict(draws)[tuple(draw)]
+        n_orders = 1 if first == second else 2
+        ordered = counts[first] / total * (counts[second] - (first == second)) / (total - 1)
+        assert proba == pytest.approx(n_orders * ordered)
+
+    assert sum(proba for _, proba in draw_distribution(counts, 3)) == pytest.approx(1)
+    assert draw_distribution((1, 0, 0, 0, 0, 0, 0, 1), 2) == (((1, 0, 0, 0, 0, 0, 0, 1), 1.0),)
+
+    # Custom weights need not be integers.
+    weights = tuple(count + 0.5 for count in counts)
+    total = sum(weights)
+    draws = dict(draw_distribution(weights, 2))
+    assert sum(draws.values()) == pytest.approx(1)
+    assert draws[(2, 0, 0, 0, 0, 0, 0, 0)] == pytest.approx(
+        weights[0] / total * (weights[0] - 1) / (total - 1))
+    assert draws[(1, 1, 0, 0, 0, 0, 0, 0)] == pytest.approx(
+        2 * weights[0] / total * weights[1] / (total - 1))
+
+def test_flock_cache():
+    np.random.seed(0)
+    deck = get_deck()
+    for _ in range(200):
+        hand = deck.copy().draw(np.random.randint(1, 30))
+        expected = {}
+        for bird, count in hand.items():
+            if count >= card_data[bird]['big']:
+                expected[bird] = 2
+            elif count >= card_data[bird]['small']:
+                expected[bird] = 1
+            else:
+                expected[bird] = 0
+        assert available_flocks(hand) == expected
+        assert flock_options(hand) == tuple(flocks_to_list(expected))
+
+    # Hands with more birds than a big flock needs share a cache entry.
+    available_flocks(['flamant'] * 3)
+    hits = flock_cache_info().hits
+    available_flocks(['flamant'] * 5)
+    assert flock_cache_info().hits == hits + 1
+
+def test_available_moves():
+    np.random.seed(0)
+    game = Game(n_players=1, n_rows=4, verbose=False)
+    game.hands[0] = UnorderedCards(['cube', 'flamant', 'flamant', 'duck', 'duck', 'duck'])
+    game.board = {
+        0: ['cube', 'sparrow', 'duck'],
+        1: ['sandwich', 'duck', 'parrot'],
+        2: ['toucan', 'sandwich', 'sparrow'],
+        3: ['sparrow', 'flamant', 'parrot'],
+    }
+    am = available_moves(game)
+    assert am[('duck', 0, 'left')] == ('small_flamant',)
+    assert am[('cube', 0, 'right')] == ('small_duck', 'small_flamant')
+
+    outcome = am[('cube', 1, 'left')]
+    assert sum(outcome.values()) == pytest.approx(1)
+    hand = UnorderedCards(['flamant', 'flamant', 'duck', 'duck', 'duck'])
+    big_flamant = sum(
+        proba for draw, proba in draw_distribution(get_deck().counts, 2)
+        if 'big_flamant' in flocks_to_list(available_flocks(hand + UnorderedCards.from_counts(draw))))
+    assert sum(p for flocks, p in outcome.items() if 'big_flamant' in flocks) == pytest.approx(big_flamant)
+
+    weighted = available_moves(game, counts={bird: 1.5 for bird in BIRDS})
+    assert sum(weighted[('cube', 1, 'left')].values()) == pytest.approx(1)
+
+def test_perf_available_moves(benchmark):
+    game = Game(3, 4, verbose=False, rng=0)
+    benchmark(available_moves, game)
+
+def test_available_moves_batch():
+    rng = np.random.default_rng(0)
+    games = []
+    for seed in range(30):
+        game = Game(3, verbose=False, rng=seed)
+        for _ in range(int(rng.integers(0, 12))):
+            if game.end:
+                break
+            random_turn(game)
+        if not game.end:
+            games.append(game)
+
+    moves = available_moves_batch(*stack_states(games))
+    assert moves.draw_probs.sum(1) == pytest.approx(np.ones(len(games)))
+    assert moves.flock_probs.sum(-1) == pytest.approx(np.ones(moves.flock_probs.shape[:3]))
+    for i, game in enumerate(games):
+        expected = available_moves(game, counts='invisible')
+        legal = {(BIRDS[b], n_row, ('left', 'right')[side])
+                 for b, n_row, side in zip(*moves.legal[i].nonzero())}
+        assert legal == set(expected)
+        for (bird, n_row, side), outcome in expected.items():
+            b, s = BIRD_INDEX[bird], ('left', 'right').index(side)
+            captured = moves.captured[i, b, n_row, s]
+            if isinstance(outcome, dict):
+                assert not captured.any()
+                probas = {}
+                for levels, p in zip(moves.draw_levels[i, b], moves.draw_probs[i]):
+                    if p:
+                        options = flocks_to_list(dict(zip(BIRDS, levels.tolist())))
+                        probas[tuple(options)] = probas.get(tuple(options), 0) + p
+                assert probas.keys() == outcome.keys()
+                for options, p in outcome.items():
+                    assert probas[options] == pytest.approx(p)
+            else:
+                assert UnorderedCards.from_counts(captured) == list(
+                    compute_lay(bird, game.board[n_row], side))
+                levels = dict(zip(BIRDS, moves.levels[i, b, n_row, s].tolist()))
+                assert tuple(flocks_to_list(levels)) == outcome
+
+def test_perf_available_moves_batch(benchmark):
+    games = [Game(4, verbose=False, rng=seed) for seed in range(200)]
+    states = stack_states(games)
+    benchmark(available_moves_batch, *states)
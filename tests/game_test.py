@@ -1,9 +1,15 @@
+import copy
+
+import numpy as np
 import pytest
 
-from ..cubirds.game import Game
-from ..cubirds.cards import UnorderedCards
+from ..cubirds.actions import decode_action, encode_move, n_lay_actions
+from ..cubirds.catalog import BIRDS
+from ..cubirds.game import Game, encoded_size
+from ..cubirds.ismcts import legal_moves
+from ..cubirds.cards import UnorderedCards, get_deck
 from ..cubirds.game_analysis import available_lays, available_flocks
-from ..random_moves import playout
+from ..random_moves import playout, random_choice
 
 
 def test_game_example():
@@ -23,20 +29,212 @@ def test_game_example():
     assert game.hands[0].l == ['sandwich']
     assert 'parrot' in game.collections[0].l
 
+def snapshot(game):
+    return (
+        game.current_turn, game.current_player, game.current_phase,
+        game.end, game.winner, game.deck.counts, game.discard.counts,
+        tuple(game.hands[p].counts for p in range(game.n_players)),
+        tuple(game.collections[p].counts for p in range(game.n_players)),
+        tuple(tuple(game.board[n]) for n in range(game.n_rows)),
+    )
+
+def test_game_clone():
+    game = Game(n_players=3, verbose=False)
+    clone = game.clone()
+    state = snapshot(game)
+    assert snapshot(clone) == state
+
+    playout(clone)
+    assert clone.end
+    assert not game.end
+    assert snapshot(game) == state
+
+    playout(game)
+    assert game.end
+
+def random_move(game):
+    if game.current_phase == 'lay':
+        return random_choice(sorted(available_lays(game.current_hand, game.board)), game.rng)
+    flocks = [bird for bird, flock in available_flocks(game.current_hand).items() if flock]
+    return random_choice(flocks + [None], game.rng)
+
+def test_game_seed():
+    games = [Game(n_players=3, verbose=False, rng=seed) for seed in (0, 0, 1)]
+    results = [playout(game) for game in games]
+    assert snapshot(games[0]) == snapshot(games[1])
+    assert results[0] == results[1]
+    assert snapshot(games[0]) != snapshot(games[2])
+
+    # Games sharing a generator draw from a single stream.
+    rng = np.random.default_rng(0)
+    assert snapshot(Game(3, verbose=False, rng=rng)) != snapshot(Game(3, verbose=False, rng=rng))
+
+def test_game_apply_undo():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        game = Game(n_players=3, verbose=False, rng=rng)
+        start = snapshot(game)
+        records = []
+        while not game.end:
+            before = snapshot(game)
+            move = random_move(game)
+            record = game.apply(move)
+            game.undo(record)
+            assert snapshot(game) == before
+
+            records.append(game.apply(move))
+
+        for record in reversed(records):
+            game.undo(record)
+        assert snapshot(game) == start
+
+def test_game_apply_undo_reshuffle():
+    game = Game(n_players=2, n_rows=1, verbose=False)
+    game.deck = UnorderedCards(['sparrow'])
+    game.discard = UnorderedCards(['duck', 'duck', 'hibou'])
+    game.board[0] = ['cube', 'sandwich']
+    game.hands[0] = UnorderedCards(['toucan'])
+    before = snapshot(game)
+
+    record = game.apply(('toucan', 0, 'right'))
+    assert game.discard.empty
+    assert len(game.hands[0]) == 2
+    game.undo(record)
+    assert snapshot(game) == before
+
+def unseen(game, player):
+    cards = game.deck.copy()
+    for p, hand in game.hands.items():
+        if p != player:
+            cards += hand
+    return cards.counts
+
+def test_game_unseen_counts():
+    rng = np.random.default_rng(0)
+    for n_players in (2, 3, 5):
+        for _ in range(10):
+            game = Game(n_players, verbose=False, rng=rng)
+            records = []
+            while not game.end:
+                for player in range(n_players):
+                    assert game.unseen_counts(player) == unseen(game, player)
+                    assert game.invisible(player) + game.visible(player) == get_deck()
+                records.append((game.apply(random_move(game)), game.clone()))
+
+            # Clones and undone moves keep their own counts.
+            for record, clone in reversed(records):
+                assert clone.unseen_counts(0) == unseen(clone, 0)
+                game.undo(record)
+                assert game.unseen_counts(1) == unseen(game, 1)
+
+    game = Game(3, verbose=False, rng=0)
+    game.hands[0] = UnorderedCards(['cube'])
+    game.recount_unseen()
+    assert game.unseen_counts(1) == unseen(game, 1)
+
+def test_game_end_message(capsys):
+    game = Game(2, rng=0)
+    game.collections[0] = UnorderedCards(['cube'] * 3 + ['duck'] * 2)
+    game.hands[0] = UnorderedCards(['duck'] * 4)
+    game.current_phase = 'flock'
+    capsys.readouterr()
+    game.flock('duck')
+    assert game.winner == 0
+    assert 'The winner is: player 0!' in capsys.readouterr().out
+
+def test_game_legal_masks():
+    rng = np.random.default_rng(0)
+    for n_rows in (1, 4):
+        game = Game(3, n_rows, verbose=False, rng=rng)
+        while not game.end:
+            if game.current_phase == 'lay':
+                mask = game.legal_lay_mask()
+                assert len(mask) == n_lay_actions(n_rows)
+            else:
+                mask = game.legal_flock_mask()
+                assert len(mask) == len(BIRDS) + 1
+            moves = [decode_action(action + (0 if game.current_phase == 'lay'
+                                              else n_lay_actions(n_rows)), n_rows)
+                     for action in mask.nonzero()[0]]
+            assert sorted(moves, key=str) == sorted(legal_moves(game), key=str)
+            game.apply(random_move(game))
+
+def test_game_step():
+    games = [Game(3, verbose=False, rng=0) for _ in range(2)]
+    rng = np.random.default_rng(0)
+    while not games[0].end:
+        # Choices come from their own generator so that both games draw
+        # the same cards.
+        move = random_choice(legal_moves(games[0]), rng)
+        action = encode_move(move, games[0].current_phase, games[0].n_rows)
+        games[0].apply(move)
+        record = games[1].step(action)
+        assert snapshot(games[1]) == snapshot(games[0])
+    games[1].undo(record)
+    assert not games[1].end
+
+    game = Game(3, verbose=False, rng=0)
+    with pytest.raises(AssertionError):
+        game.step(n_lay_actions(game.n_rows))
+
+def test_game_encode():
+    rng = np.random.default_rng(0)
+    for n_players, n_rows in [(2, 1), (3, 4), (5, 4)]:
+        game = Game(n_players, n_rows, verbose=False, rng=rng)
+        while True:
+            buf = game.encode()
+            assert len(buf) == encoded_size(n_players, n_rows)
+            assert snapshot(Game.decode(buf)) == snapshot(game)
+            assert snapshot(Game.decode(np.frombuffer(buf, dtype=np.uint8))) == snapshot(game)
+            if game.end:
+                break
+            game.apply(random_move(game))
+
+def test_game_encode_observation():
+    game = Game(3, verbose=False, rng=0)
+    obs = game.encode_observation(1)
+    assert len(obs) == encoded_size(3, 4) + 4
+    assert obs[-4:] == bytes([1, 8, 8, 8])
+
+    # Redealing the hidden cards does not change the observation.
+    other = game.clone()
+    hidden = other.deck + other.hands[0] + other.hands[2]
+    other.hands[0] = hidden.draw(8, np.random.default_rng(1))
+    other.hands[2] = hidden.draw(8, np.random.default_rng(2))
+    other.deck = hidden
+    assert other.encode() != game.encode()
+    assert other.encode_observation(1) == obs
+    assert other.encode_observation(0) != game.encode_observation(0)
+
+def test_perf_encode(benchmark):
+    game = Game(4, 4, verbose=False, rng=0)
+    benchmark(game.encode)
+
+def test_perf_decode(benchmark):
+    buf = Game(4, 4, verbose=False, rng=0).encode()
+    benchmark(Game.decode, buf)
+
 def test_perf_available_lays(benchmark):
-    game = Game(1, 4)
+    game = Game(1, 4, verbose=False, rng=0)
     hand = game.current_hand
     board = game.board
     benchmark(available_lays, hand, board)
 
 def test_perf_create_game(benchmark):
     def create():
-        Game(3, 4, verbose=False)
+        Game(3, 4, verbose=False, rng=0)
     benchmark(create)
 
 def test_perf_playout(benchmark):
     def create_and_play():
-        game = Game(3, 4, verbose=False)
-        # TODO: play
+        game = Game(3, 4, verbose=False, rng=0)
+        playout(game)
     benchmark(create_and_play)
 
+def test_perf_clone(benchmark):
+    game = Game(3, 4, verbose=False, rng=0)
+    benchmark(game.clone)
+
+def test_perf_deepcopy(benchmark):
+    game = Game(3, 4, verbose=False, rng=0)
+    benchmark(copy.deepcopy, game)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from ..cubirds.game import Game
+from ..cubirds.ismcts import ISMCTSAgent, determinize, legal_moves, search
+from ..random_moves import random_turn
+from .game_test import snapshot
+
+
+def test_determinize():
+    game = Game(n_players=3, verbose=False)
+    sample = determinize(game, 0)
+    assert sample.hands[0] == game.hands[0]
+    assert [len(sample.hands[p]) for p in range(3)] == [len(game.hands[p]) for p in range(3)]
+    hidden = game.deck + game.hands[1] + game.hands[2]
+    assert sample.deck + sample.hands[1] + sample.hands[2] == hidden
+
+def test_search():
+    game = Game(n_players=2, verbose=False, rng=0)
+    state = snapshot(game)
+    results, n_iterations = search(game, iterations=50, rng=np.random.default_rng(0))
+    assert snapshot(game) == state
+    assert n_iterations == 50
+    assert sum(visits for visits, _ in results.values()) == 50
+    assert set(results) <= set(legal_moves(game))
+
+def test_ismcts_game():
+    agent = ISMCTSAgent(iterations=10, time_ms=None, seed=0)
+    game = Game(n_players=2, verbose=False, rng=0)
+    while not game.end:
+        if game.current_player == 0:
+            agent(game)
+        else:
+            random_turn(game)
+    summary = agent.summary()
+    assert summary['decisions'] > 0
+    assert summary['iterations'] == 10
+
+def test_ismcts_parallel():
+    agent = ISMCTSAgent(iterations=20, time_ms=None, n_workers=2, seed=0)
+    try:
+        game = Game(n_players=3, verbose=False)
+        move = agent.choose_move(game)
+        assert move in legal_moves(game)
+        assert agent.stats[-1].iterations == 20
+    finally:
+        agent.close()
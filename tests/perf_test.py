@@ -0,0 +1,68 @@
+'''Throughput benchmarks on fixed seeds. Run them with ./perf, which compares
+them to the last run saved in .benchmarks/.
+'''
+import numpy as np
+import pytest
+
+from ..cubirds.cards import UnorderedCards
+from ..cubirds.game import Game
+from ..cubirds.game_analysis import available_moves
+from ..random_moves import playout, random_turn
+
+SEEDS = range(20)
+
+
+def report_throughput(benchmark, **counts):
+    '''Store the number of things per second done by each benchmark round
+    (e.g. games=20 gives games_per_sec) in the benchmark's extra info.
+    '''
+    if benchmark.stats is None:
+        return
+    mean = benchmark.stats.stats.mean
+    for name, count in counts.items():
+        benchmark.extra_info[name + '_per_sec'] = count / mean
+
+def midgame_positions(n_players, n_turns=5):
+    '''Games played randomly for n_turns turns, one per seed.'''
+    games = []
+    for seed in SEEDS:
+        game = Game(n_players, verbose=False, rng=seed)
+        for _ in range(n_turns):
+            if game.end:
+                break
+            random_turn(game)
+        if not game.end:
+            games.append(game)
+    return games
+
+@pytest.mark.parametrize('n_players', [2, 3, 4, 5])
+def test_perf_playouts(benchmark, n_players):
+    def play():
+        n_moves = 0
+        for seed in SEEDS:
+            n_moves += playout(Game(n_players, verbose=False, rng=seed))[1]
+        return n_moves
+    n_moves = benchmark.pedantic(play, rounds=5)
+    report_throughput(benchmark, games=len(SEEDS), moves=n_moves)
+
+@pytest.mark.parametrize('counts', ['deck', 'unseen'])
+def test_perf_available_moves_midgame(benchmark, counts):
+    games = midgame_positions(4)
+    args = [(game, 'deck' if counts == 'deck' else 'invisible') for game in games]
+
+    def analyse():
+        for game, c in args:
+            available_moves(game, counts=c)
+    benchmark(analyse)
+    report_throughput(benchmark, positions=len(args))
+
+def test_perf_draw_midgame_deck(benchmark):
+    # Decks as they are a few turns into 4-player games.
+    decks = [game.deck for game in midgame_positions(4)]
+    rng = np.random.default_rng(0)
+
+    def draw():
+        for deck in decks:
+            deck.copy().draw(2, rng)
+    benchmark(draw)
+    report_throughput(benchmark, draws=len(decks))
@@ -0,0 +1,84 @@
+import pytest
+
+from ..cubirds.cards import UnorderedCards
+from ..cubirds.game import Game
+from ..cubirds.ismcts import legal_moves
+from ..cubirds.planner import WIN, PlannerAgent, plan, progress
+from ..cubirds.transposition import TranspositionTable
+from ..random_moves import random_turn
+from .game_test import snapshot
+
+
+def counts(cards):
+    return UnorderedCards(cards).counts
+
+def test_progress():
+    assert progress(counts([])) == 0
+    assert progress(counts(['cube', 'duck', 'parrot'])) == 3 / 7
+    assert progress(counts(['cube'] * 3 + ['duck'] * 2)) == 5 / 6
+    assert progress(counts(['cube'] * 3 + ['duck'] * 4)) == WIN
+    assert progress(counts(['cube', 'sandwich', 'sparrow', 'duck',
+                            'parrot', 'hibou', 'toucan'])) == WIN
+
+def test_plan():
+    game = Game(3, verbose=False, rng=0)
+    state = snapshot(game)
+    for depth in (1, 2):
+        ranking, stats = plan(game, depth)
+        assert snapshot(game) == state
+        assert stats.depth == depth
+        assert sorted(move for move, _ in ranking) == sorted(legal_moves(game))
+        values = [value for _, value in ranking]
+        assert values == sorted(values, reverse=True)
+        assert all(0 < value < WIN for value in values)
+
+def test_plan_depth():
+    game = Game(2, verbose=False, rng=0)
+    with pytest.raises(ValueError):
+        plan(game, 0)
+
+def test_plan_winning_flock():
+    game = Game(2, verbose=False, rng=0)
+    game.collections[0] = UnorderedCards(['cube'] * 3 + ['duck'] * 2)
+    game.hands[0] = UnorderedCards(['duck'] * 4 + ['sparrow'] * 5)
+    game.recount_unseen()
+    game.current_phase = 'flock'
+    ranking, _ = plan(game, 2)
+    assert ranking[0] == ('duck', WIN)
+    assert [move for move, _ in ranking[1:]] != []
+
+def test_plan_table():
+    table = TranspositionTable(64)
+    game = Game(3, verbose=False, rng=0)
+    ranking, stats = plan(game, 2, table=table)
+    assert stats.nodes > 0
+
+    # The same position, reached by another game, is not searched again.
+    other = Game(3, verbose=False, rng=0)
+    assert other.hash == game.hash
+    cached, stats = plan(other, 2, table=table)
+    assert cached == ranking
+    assert stats == (2, 0, stats.elapsed_ms)
+    assert plan(other, 1, table=table)[1].nodes == 0
+    assert plan(other, 3, table=table)[1].depth == 3
+    assert table.stats()['hits'] == 3
+
+def test_plan_time_budget():
+    game = Game(4, verbose=False, rng=1)
+    ranking, stats = plan(game, depth=10, time_ms=1)
+    assert 1 <= stats.depth < 10
+    assert len(ranking) == len(legal_moves(game))
+
+def test_planner_agent():
+    agent = PlannerAgent(depth=1, time_ms=None)
+    wins = 0
+    for seed in range(10):
+        game = Game(2, verbose=False, rng=seed)
+        while not game.end:
+            if game.current_player == 0:
+                agent(game)
+            else:
+                random_turn(game)
+        wins += game.winner == 0
+    assert wins >= 8
+    assert agent.summary()['decisions'] == len(agent.stats)
@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from ..cubirds import profiling
+from ..cubirds.game import Game
+from ..cubirds.runner import PlayoutRunner
+from ..random_moves import playout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Timers are only compiled in when CUBIRDS_PROFILE is set at import time,
+# which test_timers does in a fresh interpreter, keeping them out of the
+# rest of the session and of the benchmarks.
+needs_timers = pytest.mark.skipif(not profiling.TIMERS, reason='CUBIRDS_PROFILE is not set')
+
+
+@pytest.fixture
+def stats():
+    profiling.reset()
+    profiling.enable()
+    yield profiling.stats
+    profiling.disable()
+    profiling.reset()
+
+@needs_timers
+def test_profiling(stats):
+    rng = np.random.default_rng(0)
+    n_moves = sum(playout(Game(3, verbose=False, rng=rng))[1] for _ in range(5))
+    profiling.disable()
+
+    assert stats.counts['games'] == 5
+    assert stats.counts['moves'] == n_moves
+    assert stats.calls['Game.lay'] == n_moves
+    assert stats.calls['Game._init_board'] == 5
+    assert stats.calls['available_lays'] == n_moves
+    assert stats.calls['Game.draw'] > n_moves
+    assert stats.times['Game.lay'] > stats.times['Game._complete_row'] > 0
+    assert stats.elapsed > 0
+
+    summary = stats.summary(wall_time=2.)
+    assert summary['games_per_sec'] == 2.5
+    assert summary['functions']['Game.lay']['calls'] == n_moves
+    assert 'Game.lay' in stats.report()
+
+    # Nothing is recorded while disabled.
+    playout(Game(3, verbose=False, rng=rng))
+    assert stats.counts['games'] == 5
+
+@needs_timers
+def test_profiling_merge(stats):
+    playout(Game(2, verbose=False, rng=0))
+    first = profiling.reset()
+    playout(Game(2, verbose=False, rng=1))
+    second = profiling.disable()
+
+    total = first + second
+    assert total.counts['games'] == 2
+    assert total.calls['Game.lay'] == first.calls['Game.lay'] + second.calls['Game.lay']
+    assert total.elapsed == first.elapsed + second.elapsed
+    assert first.counts['games'] == 1
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_runner_profile(tmp_path, n_workers):
+    runner = PlayoutRunner(str(tmp_path / 'playouts.bin'), 20, chunk_size=5,
+                           n_workers=n_workers, profile=True)
+    runner.run()
+    records = runner.load()
+    assert runner.profile.counts['games'] == 20
+    assert runner.profile.counts['moves'] == records['n_moves'].sum()
+    assert runner.profile.summary(runner.wall_time)['games_per_sec'] > 0
+    assert not profiling.enabled
+
+@needs_timers
+def test_runner_keeps_caller_profile(tmp_path, stats):
+    playout(Game(2, verbose=False, rng=0))
+    n_lays = stats.calls['Game.lay']
+    runner = PlayoutRunner(str(tmp_path / 'playouts.bin'), 10, chunk_size=5,
+                           n_workers=1, profile=True)
+    runner.run()
+    assert profiling.enabled and profiling.stats is stats
+    assert stats.counts['games'] == 1 and stats.calls['Game.lay'] == n_lays
+    assert runner.profile.counts['games'] == 10
+
+def test_timed_off(monkeypatch):
+    def f():
+        pass
+    monkeypatch.setattr(profiling, 'TIMERS', False)
+    assert profiling.timed()(f) is f
+
+def test_timers():
+    if profiling.TIMERS:
+        pytest.skip('Timers are already on.')
+    env = dict(os.environ, CUBIRDS_PROFILE='1')
+    subprocess.run([sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider',
+                    os.path.abspath(__file__)], cwd=ROOT, env=env, check=True)
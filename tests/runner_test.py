@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from ..cubirds.runner import RECORD, PlayoutRunner, game_seed, play_game
+
+
+def test_runner(tmp_path):
+    path = str(tmp_path / 'playouts.bin')
+    runner = PlayoutRunner(path, 25, n_players=3, seed=1, chunk_size=10, n_workers=1)
+    assert runner.run() == 25
+    records = runner.load()
+    assert len(records) == 25
+    assert sorted(records['game']) == list(range(25))
+    assert (records['n_players'] == 3).all()
+    assert set(records['winner']) <= {-1, 0, 1, 2}
+    assert (records['n_moves'] > 0).all()
+
+    # Every game can be replayed from its seed.
+    record = records[7]
+    assert record['seed'] == game_seed(1, 7)
+    game, n_moves = play_game(3, 4, int(record['seed']))
+    assert n_moves == record['n_moves']
+    assert (-1 if game.winner is None else game.winner) == record['winner']
+
+    # A finished study has nothing left to play.
+    assert runner.run() == 0
+    assert len(runner.load()) == 25
+
+def test_runner_resume(tmp_path):
+    path = str(tmp_path / 'playouts.bin')
+    reference = PlayoutRunner(str(tmp_path / 'reference.bin'), 30, seed=2,
+                              chunk_size=10, n_workers=1)
+    reference.run()
+
+    # Simulate an interrupted run: one chunk checkpointed, then a partial
+    # chunk written after the checkpoint.
+    runner = PlayoutRunner(path, 30, seed=2, chunk_size=10, n_workers=1)
+    runner._resume()
+    runner.done = {1}
+    runner.size = 10 * RECORD.itemsize
+    with open(path, 'wb') as file:
+        file.write(reference.load()[10:20].tobytes())
+        file.write(b'\0' * 5 * RECORD.itemsize)
+    runner._checkpoint()
+
+    assert runner.run() == 20
+    records = np.sort(runner.load(), order='game')
+    assert (records == np.sort(reference.load(), order='game')).all()
+
+    with pytest.raises(ValueError):
+        PlayoutRunner(path, 30, seed=3, chunk_size=10).run()
+
+def test_runner_parallel(tmp_path):
+    path = str(tmp_path / 'playouts.bin')
+    runner = PlayoutRunner(path, 40, seed=0, chunk_size=10, n_workers=2)
+    runner.run()
+    serial = PlayoutRunner(str(tmp_path / 'serial.bin'), 40, seed=0,
+                           chunk_size=10, n_workers=1)
+    serial.run()
+    assert (np.sort(runner.load(mmap=True), order='game')
+            == np.sort(serial.load(), order='game')).all()
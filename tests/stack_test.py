@@ -1,6 +1,7 @@
+import numpy as np
 import pytest
 
-from ..cubirds.cards import UnorderedCards, get_deck
+from ..cubirds.cards import BIRDS, Row, UnorderedCards, get_deck
 
 def test_stack_example():
     stack = UnorderedCards(['cube', 'cube'])
@@ -33,11 +34,69 @@ def test_stack_example():
     assert sorted(res.l) == ['cube', 'sandwich'] or sorted(res.l) == ['cube', 'cube']
     assert sorted((stack + res).l) == ['cube', 'cube', 'sandwich']
 
+def test_draw_rng():
+    draws = [get_deck().draw(20, np.random.default_rng(seed)) for seed in (0, 0, 1)]
+    assert draws[0] == draws[1]
+    assert draws[0] != draws[2]
+    assert len(draws[2]) == 20
+
+    # Drawing is uniform over the cards: 2 sandwiches in 3 cards.
+    rng = np.random.default_rng(0)
+    n = sum(UnorderedCards(['cube', 'sandwich', 'sandwich']).draw(1, rng)['sandwich']
+            for _ in range(3000))
+    assert abs(n / 3000 - 2 / 3) < 0.03
+
 
 def draw_one_by_one(stack):
     for _ in range(len(stack)):
         stack.draw()
 
 def test_pref_draw_deck(benchmark):
+    benchmark.pedantic(draw_one_by_one, setup=lambda: ((get_deck(),), {}), rounds=2000)
+
+def test_row_example():
+    row = Row(['cube', 'sparrow', 'duck', 'sparrow'])
+    assert row == ['cube', 'sparrow', 'duck', 'sparrow']
+    assert row.n_unique() == 3
+    assert row.n_captured('cube', 'right') == 3
+    assert row.n_captured('cube', 'left') == 0
+    assert row.n_captured('sparrow', 'right') == 0
+    assert row.n_captured('sparrow', 'left') == 1
+    assert row.n_captured('toucan', 'left') == 0
+    assert row.captured('cube', 'right') == ['sparrow', 'duck', 'sparrow']
+
+    assert row.lay('sparrow', 2, 'left') == ['cube']
+    assert row == ['sparrow', 'sparrow', 'sparrow', 'duck', 'sparrow']
+    assert row.lay('duck', 1, 'right') == ['sparrow']
+    assert row == ['sparrow', 'sparrow', 'sparrow', 'duck', 'duck']
+    assert row.captured('duck', 'left') == ['sparrow', 'sparrow', 'sparrow']
+    assert row.lay('duck', 1, 'left') == ['sparrow', 'sparrow', 'sparrow']
+    assert row == ['duck', 'duck', 'duck']
+    assert row.n_unique() == 1
+    assert row.counts[BIRDS.index('duck')] == 3
+
+    copy = row.copy()
+    copy.append('cube')
+    assert copy.n_captured('duck', 'right') == 1
+    assert row.n_captured('duck', 'right') == 0
+
+def test_row_matches_list():
+    np.random.seed(0)
     deck = get_deck()
-    benchmark(draw_one_by_one, deck)
+    for _ in range(200):
+        cards = deck.copy().draw(6).l
+        np.random.shuffle(cards)
+        row = Row(cards)
+        for _ in range(5):
+            bird = BIRDS[np.random.randint(len(BIRDS))]
+            side = ['left', 'right'][np.random.randint(2)]
+            # Reference implementation on a plain list.
+            ref = cards if side == 'right' else cards[::-1]
+            ix = [i for i, x in enumerate(ref) if x == bird]
+            captured = ref[ix[-1] + 1:] if ix else []
+            ref = (ref[:ix[-1] + 1] if ix else ref) + [bird] * 2
+            cards = ref if side == 'right' else ref[::-1]
+
+            assert row.lay(bird, 2, side) == captured
+            assert row == cards
+            assert row.counts == UnorderedCards(cards).counts
@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+import pytest
+
+from ..cubirds.events import EventLog, Flock
+from ..cubirds.game import Game
+from ..cubirds.runner import PlayoutRunner
+from ..cubirds.stats import CONDITIONS, PlayoutStats, wilson_interval
+from ..random_moves import playout
+
+
+def play(n_games, seed):
+    stats = PlayoutStats()
+    log = EventLog()
+    rng = np.random.default_rng(seed)
+    games = []
+    for _ in range(n_games):
+        def on_event(event):
+            stats(event)
+            log(event)
+        game = Game(3, verbose=False, rng=rng, on_event=on_event)
+        games.append((game, playout(game)[1]))
+    return stats, log, games
+
+def test_playout_stats():
+    stats, log, games = play(20, 0)
+    assert stats.n_games[3] == 20 and stats.n_games.sum() == 20
+    assert stats.conditions.sum() == 20
+    for seat in range(3):
+        assert stats.wins[3, seat] == sum(game.winner == seat for game, _ in games)
+    assert stats.conditions[CONDITIONS.index('no cards')] == sum(
+        game.winner is None for game, _ in games)
+    lengths = np.bincount([n_moves for _, n_moves in games], minlength=len(stats.lengths))
+    assert (stats.lengths == lengths).all()
+    assert stats.flocks.sum() == len(log.of_type(Flock))
+
+    summary = stats.summary()
+    assert summary['games'] == 20
+    assert summary['moves_mean'] == np.mean([n_moves for _, n_moves in games])
+    assert sum(summary['conditions'].values()) == 1
+    assert len(summary['seats'][3]) == 3
+    assert stats.report().startswith('Games: 20')
+    assert PlayoutStats().report() == 'No games.'
+
+def test_playout_stats_merge():
+    first, _, _ = play(10, 1)
+    second, _, _ = play(10, 2)
+    both = first + second
+    assert both.n_games.sum() == 20
+    assert (both.lengths == first.lengths + second.lengths).all()
+
+    with pytest.raises(ValueError):
+        first.merge(PlayoutStats(max_moves=10))
+
+    restored = PlayoutStats.from_dict(json.loads(json.dumps(both.to_dict())))
+    assert restored.to_dict() == both.to_dict()
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (0., 1.)
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high
+    assert abs(low - 0.4038) < 1e-3 and abs(high - 0.5962) < 1e-3
+    assert wilson_interval(0, 10)[0] == 0.
+
+def test_runner_stats(tmp_path):
+    path = str(tmp_path / 'playouts.bin')
+    runner = PlayoutRunner(path, 30, seed=4, chunk_size=10, n_workers=1, stats=True)
+    runner.run()
+    records = runner.load()
+    assert runner.stats.n_games[3] == 30
+    lengths = np.bincount(records['n_moves'], minlength=len(runner.stats.lengths))
+    assert (runner.stats.lengths == lengths).all()
+
+    # Statistics are restored from the checkpoint with the records.
+    reader = PlayoutRunner(path, 30, seed=4, chunk_size=10, stats=True)
+    reader.load()
+    assert reader.stats.to_dict() == runner.stats.to_dict()
+
+    # Chunks played without statistics cannot be counted on resume.
+    path = str(tmp_path / 'no_stats.bin')
+    PlayoutRunner(path, 30, seed=4, chunk_size=10, n_workers=1).run()
+    with pytest.raises(ValueError):
+        PlayoutRunner(path, 30, seed=4, chunk_size=10, n_workers=1, stats=True).run()
+
+def test_playout_stats_needs_deal():
+    stats = PlayoutStats()
+    game = Game(2, verbose=False, rng=0)
+    game.on_event = stats
+    with pytest.raises(ValueError, match='Deal'):
+        playout(game)
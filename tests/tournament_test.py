@@ -0,0 +1,85 @@
+import math
+
+from ..cubirds.cards import UnorderedCards
+from ..cubirds.tournament import (greedy_turn, play_match, sprt_bounds,
+                                  sprt_llr, tournament)
+from ..random_moves import random_turn
+from .game_test import snapshot
+
+
+def test_sprt():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert lower == -upper == -math.log(19)
+    assert sprt_llr(0, 0, 0.45, 0.55) == 0
+    assert abs(sprt_llr(10, 10, 0.45, 0.55)) < 1e-12
+    assert sprt_llr(11, 10, 0.45, 0.55) > 0 > sprt_llr(10, 11, 0.45, 0.55)
+
+def test_play_match():
+    result = play_match(random_turn, greedy_turn, n_players=2, max_rounds=100)
+    assert result.winner == 'b'
+    assert result.games < 200
+    assert result.games % 2 == 0
+    assert result.wins + result.losses + result.draws == result.games
+    assert result.llr <= sprt_bounds()[0]
+
+    result = play_match(random_turn, random_turn, n_players=3, max_rounds=2)
+    assert result.winner is None and result.games == 6
+
+def test_sprt_equal_agents():
+    # Equal agents should rarely be told apart (alpha + beta = 10%).
+    results = [play_match(random_turn, random_turn, n_players=2, max_rounds=50, seed=seed)
+               for seed in range(10)]
+    assert sum(result.winner is not None for result in results) <= 1
+    assert all(sprt_bounds()[0] < result.llr < sprt_bounds()[1]
+               for result in results if result.winner is None)
+
+def test_common_random_numbers():
+    deals = []
+
+    def recorder():
+        def agent(game):
+            # Whoever sits first records the deal.
+            if game.current_turn == 0 and game.current_player == 0:
+                deals.append(snapshot(game))
+            random_turn(game)
+        return agent
+
+    play_match(recorder(), recorder(), n_players=3, max_rounds=2)
+    assert deals[0] == deals[1] == deals[2] != deals[3] == deals[4] == deals[5]
+
+def test_common_draws():
+    # Cumulative counts of the cards drawn from the deck of each game, after
+    # every draw, keyed by the number of cards drawn so far.
+    games = []
+
+    class RecordingDeck(UnorderedCards):
+        def draw(self, n=1, rng=None):
+            out = super().draw(n, rng)
+            total = [t + c for t, c in zip(self.total, out.counts)]
+            self.total = total
+            games[-1][sum(total)] = tuple(total)
+            return out
+
+    def recorder(agent):
+        def play_turn(game):
+            # Until the first reshuffle, which replaces the deck.
+            if game.current_turn == 0 and game.current_player == 0:
+                game.deck = RecordingDeck.from_counts(game.deck.counts)
+                game.deck.total = [0] * len(game.deck.counts)
+                games.append({})
+            agent(game)
+        return play_turn
+
+    # a plays randomly from game.rng, b does not use it: the cards must not
+    # depend on it.
+    play_match(recorder(random_turn), recorder(greedy_turn), n_players=2, max_rounds=3)
+    for first, second in zip(games[::2], games[1::2]):
+        common = set(first) & set(second)
+        assert len(common) >= 5
+        assert all(first[n] == second[n] for n in common)
+
+def test_tournament():
+    results = tournament({'random': random_turn, 'greedy': greedy_turn, 'other': random_turn},
+                         n_players=(2, 4), max_rounds=3)
+    assert set(results) == {(a, b, n) for a, b in [('random', 'greedy'), ('random', 'other'),
+                                                   ('greedy', 'other')] for n in (2, 4)}
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from ..cubirds.cards import UnorderedCards
+from ..cubirds.game import Game
+from ..cubirds.transposition import TranspositionTable
+from .game_test import random_move
+
+
+def test_hash_incremental():
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        game = Game(n_players=3, verbose=False, rng=rng)
+        game.enable_hashing()
+        records = []
+        while not game.end:
+            before = game.hash
+            records.append(game.apply(random_move(game)))
+            clone = game.clone()
+            clone._hashes = None
+            assert game.hash == clone.hash
+            assert game.hash != before
+        for record in reversed(records):
+            game.undo(record)
+        game_start = game.clone()
+        game_start._hashes = None
+        assert game.hash == game_start.hash
+
+def test_hash_positions():
+    game = Game(n_players=2, n_rows=2, verbose=False, rng=0)
+    game.board[0] = ['cube', 'duck']
+    game.board[1] = ['sparrow', 'parrot']
+    game.hands[0] = UnorderedCards(['cube', 'cube'])
+    game.hands[1] = UnorderedCards(['cube', 'duck'])
+    h = game.hash
+    assert Game.decode(game.encode()).hash == h
+
+    # Same cards, different places.
+    other = game.clone()
+    other.board[0] = ['duck', 'cube']
+    assert other.hash != h
+    other = game.clone()
+    other.board[0], other.board[1] = game.board[1], game.board[0]
+    assert other.hash != h
+    other = game.clone()
+    other.hands[0], other.hands[1] = game.hands[1], game.hands[0]
+    assert other.hash != h
+    other = game.clone()
+    other.current_phase = 'flock'
+    assert other.hash != h
+
+    # A new round reached in two ways: hands are order-free multisets.
+    other = game.clone()
+    other.hands[0] = UnorderedCards(['cube']) + ['cube']
+    assert other.hash == h
+
+def test_hash_size():
+    game = Game(n_players=2, n_rows=9, verbose=False, rng=0)
+    with pytest.raises(ValueError, match='rows'):
+        game.enable_hashing()
+    with pytest.raises(ValueError):
+        game.hash
+
+def test_transposition_table():
+    table = TranspositionTable(4)
+    assert table.size == 4
+    assert table.get(1) is None
+    table.put(1, 'a', weight=5)
+    assert table.get(1) == 'a'
+    assert 1 in table
+
+    # 3 and 5 go in the same bucket as 1: shallower entries do not evict it.
+    table.put(3, 'b', weight=1)
+    table.put(5, 'c', weight=1)
+    assert table.get(1) == 'a'
+    assert table.get(3) is None
+    assert table.get(5) == 'c'
+
+    # A deeper entry demotes it to the second slot.
+    table.put(7, 'd', weight=9)
+    assert table.get(7) == 'd'
+    assert table.get(1) == 'a'
+    assert table.get(5) is None
+    table.put(1, 'e', weight=10)
+    assert table.get(1) == 'e'
+    assert len(table) == 2
+
+    stats = table.stats()
+    assert stats['hits'] == 6
+    assert stats['misses'] == 3
+    assert stats['replacements'] == 2
+    assert stats['fill'] == 0.5
+
+    table.clear()
+    assert len(table) == 0
+    assert table.stats()['lookups'] == 0
+
+def test_perf_hash_playout(benchmark):
+    def create_and_play():
+        game = Game(3, 4, verbose=False, rng=0)
+        game.enable_hashing()
+        while not game.end:
+            game.apply(random_move(game))
+            game.hash
+    benchmark(create_and_play)